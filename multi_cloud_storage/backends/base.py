@@ -5,12 +5,18 @@ from abc import ABC, abstractmethod
 
 
 class CloudStorageBackend(ABC):
+	limiter = None
+
+	def throttle(self, requests=1, nbytes=0):
+		if self.limiter:
+			self.limiter.acquire(requests, nbytes)
+
 	@abstractmethod
 	def upload(self, file_path, key, content_type, is_private, file_name=None):
 		pass
 
 	@abstractmethod
-	def delete(self, key, bucket_type="private"):
+	def delete(self, key, bucket_type="private", force=False):
 		pass
 
 	@abstractmethod
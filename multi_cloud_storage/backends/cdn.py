@@ -0,0 +1,81 @@
+# Copyright (c) 2026, Bhushan Barbuddhe and contributors
+# For license information, please see license.txt
+
+import base64
+import datetime
+import hashlib
+import hmac
+import time
+from urllib.parse import quote
+
+import frappe
+from botocore.signers import CloudFrontSigner
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding
+
+
+def get_cdn_domain(config, bucket_type):
+	if not config.get("enable_cdn"):
+		return None
+	field = "cdn_public_domain" if bucket_type == "public" else "cdn_private_domain"
+	domain = (config.get(field) or "").strip().rstrip("/")
+	return domain or None
+
+
+def get_cdn_base_url(domain):
+	if domain.startswith("http://") or domain.startswith("https://"):
+		return domain
+	return f"https://{domain}"
+
+
+def cdn_url(domain, key):
+	return f"{get_cdn_base_url(domain)}/{quote(key)}"
+
+
+def get_cache_control(config, is_private):
+	if not config.get("enable_cdn"):
+		return None
+	max_age = config.get("cache_control_max_age") or 0
+	if max_age <= 0:
+		return None
+	if is_private:
+		return f"max-age={max_age}"
+	return f"public, max-age={max_age}"
+
+
+def _get_signing_key():
+	raw = frappe.db.get_single_value("Cloud Storage Configuration", "cdn_private_key")
+	if not raw or not raw.strip():
+		frappe.throw(frappe._("CDN Signing Key is required for private CDN URLs"))
+	try:
+		return frappe.utils.password.decrypt(raw)
+	except Exception:
+		return raw
+
+
+def _get_key_id(config):
+	key_id = (config.get("cdn_key_pair_id") or "").strip()
+	if not key_id:
+		frappe.throw(frappe._("CDN Signing Key ID is required for private CDN URLs"))
+	return key_id
+
+
+def cloudfront_signed_url(config, url, expiry):
+	private_key = serialization.load_pem_private_key(_get_signing_key().encode(), password=None)
+
+	def rsa_signer(message):
+		return private_key.sign(message, padding.PKCS1v15(), hashes.SHA1())
+
+	signer = CloudFrontSigner(_get_key_id(config), rsa_signer)
+	expires = datetime.datetime.now(datetime.UTC) + datetime.timedelta(seconds=expiry)
+	return signer.generate_presigned_url(url, date_less_than=expires)
+
+
+def cloud_cdn_signed_url(config, url, expiry):
+	key = base64.urlsafe_b64decode(_get_signing_key().strip())
+	expires = int(time.time()) + expiry
+	separator = "&" if "?" in url else "?"
+	url_to_sign = f"{url}{separator}Expires={expires}&KeyName={_get_key_id(config)}"
+	digest = hmac.new(key, url_to_sign.encode(), hashlib.sha1).digest()
+	signature = base64.urlsafe_b64encode(digest).decode()
+	return f"{url_to_sign}&Signature={signature}"
@@ -4,7 +4,9 @@
 import datetime
 import json
 import random
+import shutil
 import string
+from concurrent.futures import ThreadPoolExecutor
 
 import frappe
 from google.api_core import exceptions as gcs_exceptions
@@ -12,12 +14,17 @@ from google.cloud import storage
 from google.oauth2 import service_account
 
 from .base import CloudStorageBackend
+from .cdn import cdn_url, cloud_cdn_signed_url, get_cache_control, get_cdn_domain
+from .ratelimit import get_limiter
+
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
 
 
 class GCSBackend(CloudStorageBackend):
 	def __init__(self, config):
 		self.config = config
 		self._client = None
+		self.limiter = get_limiter(config)
 
 	@property
 	def client(self):
@@ -69,17 +76,69 @@ class GCSBackend(CloudStorageBackend):
 		return f"{prefix}/{key_suffix}_{file_name}"
 
 	def upload(self, file_path, key, content_type, is_private, file_name=None):
+		if self.limiter:
+			# read through the limiter so the upload itself is paced, not only its start
+			with open(file_path, "rb") as f:
+				return self.upload_fileobj(f, key, content_type, is_private, file_name)
 		bucket_type = "private" if is_private else "public"
 		bucket = self._bucket(bucket_type)
 		blob = bucket.blob(key)
+		cache_control = get_cache_control(self.config, is_private)
+		if cache_control:
+			blob.cache_control = cache_control
 		blob.upload_from_filename(file_path, content_type=content_type)
 		return key
 
-	def delete(self, key, bucket_type="private"):
+	def upload_fileobj(self, fileobj, key, content_type, is_private, file_name=None):
+		bucket_type = "private" if is_private else "public"
+		blob = self._bucket(bucket_type).blob(key)
+		cache_control = get_cache_control(self.config, is_private)
+		if cache_control:
+			blob.cache_control = cache_control
+		self.throttle()
+		if self.limiter:
+			fileobj = self.limiter.wrap_reader(fileobj)
+		# upload_from_file needs tell() on the source; the blob writer buffers chunks itself
+		with blob.open("wb", chunk_size=UPLOAD_CHUNK_SIZE, ignore_flush=True, content_type=content_type) as f:
+			shutil.copyfileobj(fileobj, f, UPLOAD_CHUNK_SIZE)
+		return key
+
+	def get_uploader(self, is_private):
+		bucket = self._bucket("private" if is_private else "public")
+		cache_control = get_cache_control(self.config, is_private)
+		limiter = self.limiter
+
+		def upload(fileobj, key, content_type, file_name=None, size=0):
+			blob = bucket.blob(key)
+			if cache_control:
+				blob.cache_control = cache_control
+			if limiter:
+				limiter.acquire(1, size)
+			blob.upload_from_file(fileobj, content_type=content_type, size=size or None)
+			return key
+
+		return upload
+
+	def stream_reader(self, bucket_type="private", chunk_size=1024 * 1024):
+		bucket = self._bucket(bucket_type)
+		limiter = self.limiter
+
+		def read(key):
+			if limiter:
+				limiter.acquire()
+			with bucket.blob(key).open("rb", chunk_size=chunk_size) as f:
+				while chunk := f.read(chunk_size):
+					if limiter:
+						limiter.acquire(0, len(chunk))
+					yield chunk
+
+		return read
+
+	def delete(self, key, bucket_type="private", force=False):
 		if not key:
 			return
 		delete_enabled = frappe.db.get_single_value("Cloud Storage Configuration", "delete_file_from_cloud")
-		if not delete_enabled:
+		if not force and not delete_enabled:
 			return
 		bucket_name = frappe.db.get_single_value(
 			"Cloud Storage Configuration",
@@ -88,6 +147,7 @@ class GCSBackend(CloudStorageBackend):
 		if not bucket_name:
 			return
 		bucket = self.client.bucket(bucket_name)
+		self.throttle()
 		try:
 			bucket.delete_blob(key)
 		except gcs_exceptions.NotFound:
@@ -99,13 +159,37 @@ class GCSBackend(CloudStorageBackend):
 			)
 			frappe.throw(frappe._("Could not delete file from cloud: {0}").format(str(e)))
 
+	def set_storage_class(self, keys, storage_class, bucket_type="private", max_workers=8):
+		bucket = self._bucket(bucket_type)
+
+		def _rewrite(key):
+			self.throttle()
+			try:
+				bucket.blob(key).update_storage_class(storage_class)
+				return key, None, False
+			except gcs_exceptions.NotFound as e:
+				return key, str(e), True
+			except Exception as e:
+				return key, str(e), False
+
+		with ThreadPoolExecutor(max_workers=max_workers) as pool:
+			return list(pool.map(_rewrite, keys))
+
 	def get_url(self, key, file_name=None, bucket_type="private"):
+		domain = get_cdn_domain(self.config, bucket_type)
+		if domain:
+			return cloud_cdn_signed_url(
+				self.config, cdn_url(domain, key), self.config.signed_url_expiry_time or 300
+			)
 		bucket = self._bucket(bucket_type)
 		blob = bucket.blob(key)
 		expiry = datetime.timedelta(seconds=self.config.signed_url_expiry_time or 300)
 		return blob.generate_signed_url(version="v4", expiration=expiry, method="GET")
 
 	def get_public_url(self, key):
+		domain = get_cdn_domain(self.config, "public")
+		if domain:
+			return cdn_url(domain, key)
 		blob = self._bucket("public").blob(key)
 		return blob.public_url
 
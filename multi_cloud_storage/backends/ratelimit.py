@@ -0,0 +1,188 @@
+# Copyright (c) 2026, Bhushan Barbuddhe and contributors
+# For license information, please see license.txt
+
+import io
+import time
+
+import frappe
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITIES = (INTERACTIVE, BULK)
+DIMENSIONS = ("requests", "bytes")
+BURST_SECONDS = 2
+MAX_SLEEP = 1.0
+MAX_WAIT = {INTERACTIVE: 30, BULK: 600}
+# bulk transfers wait while the interactive bucket is below this fraction of its capacity
+BULK_YIELD_THRESHOLD = 0.5
+
+# KEYS[1]: bucket to take from, KEYS[2] (optional): bucket that must stay above a threshold
+# ARGV: rate, capacity, amount, force[, yield_rate, yield_capacity, yield_threshold]
+# Returns "0" when granted, otherwise the seconds to wait before retrying.
+# With force=1 the tokens are always taken, leaving the bucket in debt that later callers wait off.
+TOKEN_BUCKET_LUA = """
+local function level(key, rate, capacity, now)
+	local data = redis.call("HMGET", key, "tokens", "ts")
+	local tokens = tonumber(data[1])
+	local ts = tonumber(data[2])
+	if tokens == nil or ts == nil then
+		return capacity
+	end
+	return math.min(capacity, tokens + math.max(0, now - ts) * rate)
+end
+
+local t = redis.call("TIME")
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local amount = tonumber(ARGV[3])
+local force = ARGV[4] == "1"
+
+if KEYS[2] and not force then
+	local y_rate = tonumber(ARGV[5])
+	local y_floor = tonumber(ARGV[6]) * tonumber(ARGV[7])
+	local y_tokens = level(KEYS[2], y_rate, tonumber(ARGV[6]), now)
+	if y_tokens < y_floor then
+		return tostring((y_floor - y_tokens) / y_rate)
+	end
+end
+
+local tokens = level(KEYS[1], rate, capacity, now)
+local need = math.min(amount, capacity)
+if tokens < need and not force then
+	return tostring((need - tokens) / rate)
+end
+tokens = tokens - amount
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "ts", tostring(now))
+redis.call("EXPIRE", KEYS[1], math.ceil((capacity - tokens) / rate) + 60)
+return "0"
+"""
+
+# ARGV: rate, capacity. Returns the current token level as a string.
+TOKEN_LEVEL_LUA = """
+local t = redis.call("TIME")
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local data = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(data[1])
+local ts = tonumber(data[2])
+if tokens == nil or ts == nil then
+	return tostring(capacity)
+end
+return tostring(math.min(capacity, tokens + math.max(0, now - ts) * rate))
+"""
+
+
+def get_priority():
+	if frappe.flags.cloud_storage_priority in PRIORITIES:
+		return frappe.flags.cloud_storage_priority
+	return INTERACTIVE if getattr(frappe.local, "request", None) else BULK
+
+
+def get_rates(config):
+	mb = 1024 * 1024
+	return {
+		(INTERACTIVE, "requests"): config.get("interactive_requests_per_second") or 0,
+		(INTERACTIVE, "bytes"): (config.get("interactive_bandwidth") or 0) * mb,
+		(BULK, "requests"): config.get("bulk_requests_per_second") or 0,
+		(BULK, "bytes"): (config.get("bulk_bandwidth") or 0) * mb,
+	}
+
+
+def get_limiter(config, priority=None):
+	if not config.get("enable_rate_limit"):
+		return None
+	return RateLimiter(config, priority or get_priority())
+
+
+class RateLimiter:
+	def __init__(self, config, priority):
+		self.priority = priority
+		self.rates = get_rates(config)
+		self.keys = {
+			(p, d): frappe.cache.make_key(f"multi_cloud_storage:ratelimit:{p}:{d}")
+			for p in PRIORITIES
+			for d in DIMENSIONS
+		}
+		self._take = frappe.cache.register_script(TOKEN_BUCKET_LUA)
+		self._level = frappe.cache.register_script(TOKEN_LEVEL_LUA)
+
+	def _try_take(self, dimension, amount, force=False):
+		rate = self.rates[(self.priority, dimension)]
+		if rate <= 0 or amount <= 0:
+			return 0
+		keys = [self.keys[(self.priority, dimension)]]
+		args = [rate, rate * BURST_SECONDS, amount, 1 if force else 0]
+		yield_rate = self.rates[(INTERACTIVE, dimension)]
+		if self.priority == BULK and yield_rate > 0:
+			keys.append(self.keys[(INTERACTIVE, dimension)])
+			args += [yield_rate, yield_rate * BURST_SECONDS, BULK_YIELD_THRESHOLD]
+		return float(self._take(keys=keys, args=args))
+
+	def acquire(self, requests=1, nbytes=0):
+		deadline = time.monotonic() + MAX_WAIT[self.priority]
+		for dimension, amount in (("requests", requests), ("bytes", nbytes)):
+			force = False
+			while True:
+				try:
+					wait = self._try_take(dimension, amount, force)
+				except Exception:
+					return
+				if wait <= 0:
+					break
+				remaining = deadline - time.monotonic()
+				if remaining <= 0:
+					# go ahead, but still take the tokens so the overrun is paid back by later transfers
+					frappe.logger("multi_cloud_storage").warning(
+						f"rate limit wait exceeded {MAX_WAIT[self.priority]}s for {self.priority} {dimension}"
+					)
+					force = True
+					continue
+				time.sleep(min(wait, MAX_SLEEP, remaining))
+
+	def wrap_reader(self, fileobj):
+		return ThrottledReader(fileobj, self)
+
+	def get_utilisation(self):
+		utilisation = {}
+		for (priority, dimension), rate in self.rates.items():
+			if rate <= 0:
+				utilisation.setdefault(priority, {})[dimension] = None
+				continue
+			capacity = rate * BURST_SECONDS
+			tokens = float(self._level(keys=[self.keys[(priority, dimension)]], args=[rate, capacity]))
+			utilisation.setdefault(priority, {})[dimension] = {
+				"rate": rate,
+				"capacity": capacity,
+				"available": max(tokens, 0),
+				"utilisation": round(min(1, max(0, 1 - tokens / capacity)), 4),
+			}
+		return utilisation
+
+
+class ThrottledReader(io.RawIOBase):
+	def __init__(self, fileobj, limiter):
+		self._fileobj = fileobj
+		self._limiter = limiter
+
+	def readable(self):
+		return True
+
+	def seekable(self):
+		return self._fileobj.seekable()
+
+	def seek(self, offset, whence=io.SEEK_SET):
+		return self._fileobj.seek(offset, whence)
+
+	def tell(self):
+		return self._fileobj.tell()
+
+	def readinto(self, b):
+		data = self._fileobj.read(len(b))
+		if not data:
+			return 0
+		self._limiter.acquire(0, len(data))
+		n = len(data)
+		b[:n] = data
+		return n
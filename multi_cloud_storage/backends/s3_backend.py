@@ -5,6 +5,8 @@ import datetime
 import random
 import re
 import string
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
 
 import boto3
 import frappe
@@ -12,19 +14,26 @@ from botocore.client import Config
 from botocore.exceptions import ClientError
 
 from .base import CloudStorageBackend
+from .cdn import cdn_url, cloudfront_signed_url, get_cache_control, get_cdn_domain
+from .ratelimit import get_limiter
+
+MAX_POOL_CONNECTIONS = 32
+# errors about a single object, as opposed to the bucket, credentials or request
+OBJECT_ERROR_CODES = ("NoSuchKey", "404", "InvalidObjectState")
 
 
 class S3Backend(CloudStorageBackend):
 	def __init__(self, config):
 		self.config = config
 		self._client = None
+		self.limiter = get_limiter(config)
 
 	@property
 	def client(self):
 		if self._client is None:
 			kwargs = {
 				"region_name": self.config.get("s3_region_name") or "us-east-1",
-				"config": Config(signature_version="s3v4"),
+				"config": Config(signature_version="s3v4", max_pool_connections=MAX_POOL_CONNECTIONS),
 			}
 			aws_key = self.config.get("s3_aws_key")
 			raw = frappe.db.get_single_value("Cloud Storage Configuration", "s3_aws_secret")
@@ -71,35 +80,129 @@ class S3Backend(CloudStorageBackend):
 		return f"{prefix}/{key_suffix}_{file_name}"
 
 	def upload(self, file_path, key, content_type, is_private, file_name=None):
+		if self.limiter:
+			# read through the limiter so the upload itself is paced, not only its start
+			with open(file_path, "rb") as f:
+				return self.upload_fileobj(f, key, content_type, is_private, file_name)
 		bucket_type = "private" if is_private else "public"
 		bucket = self._bucket(bucket_type)
 		extra = {"ContentType": content_type, "Metadata": {"file_name": file_name or ""}}
 		if not is_private:
 			extra["ACL"] = "public-read"
+		cache_control = get_cache_control(self.config, is_private)
+		if cache_control:
+			extra["CacheControl"] = cache_control
 		try:
 			self.client.upload_file(file_path, bucket, key, ExtraArgs=extra)
 		except Exception as e:
 			frappe.throw(frappe._("File upload failed: {0}").format(str(e)))
 		return key
 
-	def delete(self, key, bucket_type="private"):
-		if not self.config.delete_file_from_cloud:
+	def upload_fileobj(self, fileobj, key, content_type, is_private, file_name=None):
+		bucket_type = "private" if is_private else "public"
+		bucket = self._bucket(bucket_type)
+		extra = {"ContentType": content_type, "Metadata": {"file_name": file_name or ""}}
+		if not is_private:
+			extra["ACL"] = "public-read"
+		cache_control = get_cache_control(self.config, is_private)
+		if cache_control:
+			extra["CacheControl"] = cache_control
+		self.throttle()
+		if self.limiter:
+			fileobj = self.limiter.wrap_reader(fileobj)
+		try:
+			self.client.upload_fileobj(fileobj, bucket, key, ExtraArgs=extra)
+		except Exception as e:
+			frappe.throw(frappe._("File upload failed: {0}").format(str(e)))
+		return key
+
+	def get_uploader(self, is_private):
+		client = self.client
+		bucket = self._bucket("private" if is_private else "public")
+		cache_control = get_cache_control(self.config, is_private)
+		limiter = self.limiter
+
+		def upload(fileobj, key, content_type, file_name=None, size=0):
+			extra = {"ContentType": content_type, "Metadata": {"file_name": file_name or ""}}
+			if not is_private:
+				extra["ACL"] = "public-read"
+			if cache_control:
+				extra["CacheControl"] = cache_control
+			if limiter:
+				limiter.acquire(1, size)
+			client.upload_fileobj(fileobj, bucket, key, ExtraArgs=extra)
+			return key
+
+		return upload
+
+	def stream_reader(self, bucket_type="private", chunk_size=1024 * 1024):
+		client = self.client
+		bucket = self._bucket(bucket_type)
+		limiter = self.limiter
+
+		def read(key):
+			if limiter:
+				limiter.acquire()
+			body = client.get_object(Bucket=bucket, Key=key)["Body"]
+			try:
+				for chunk in body.iter_chunks(chunk_size):
+					if limiter:
+						limiter.acquire(0, len(chunk))
+					yield chunk
+			finally:
+				body.close()
+
+		return read
+
+	def delete(self, key, bucket_type="private", force=False):
+		if not force and not self.config.delete_file_from_cloud:
 			return
 		bucket = self._bucket(bucket_type)
+		self.throttle()
 		try:
 			self.client.delete_object(Bucket=bucket, Key=key)
 		except ClientError:
 			frappe.throw(frappe._("Could not delete file from cloud"))
 
-	def get_url(self, key, file_name=None, bucket_type="private"):
+	def set_storage_class(self, keys, storage_class, bucket_type="private", max_workers=8):
+		client = self.client
 		bucket = self._bucket(bucket_type)
+		extra = {"StorageClass": storage_class, "MetadataDirective": "COPY"}
+		if bucket_type == "public":
+			extra["ACL"] = "public-read"
+
+		def _copy(key):
+			self.throttle()
+			try:
+				client.copy({"Bucket": bucket, "Key": key}, bucket, key, ExtraArgs=extra)
+				return key, None, False
+			except ClientError as e:
+				return key, str(e), e.response.get("Error", {}).get("Code") in OBJECT_ERROR_CODES
+			except Exception as e:
+				return key, str(e), False
+
+		with ThreadPoolExecutor(max_workers=max_workers) as pool:
+			return list(pool.map(_copy, keys))
+
+	def get_url(self, key, file_name=None, bucket_type="private"):
 		expiry = self.config.signed_url_expiry_time or 300
+		domain = get_cdn_domain(self.config, bucket_type)
+		if domain:
+			url = cdn_url(domain, key)
+			if file_name:
+				# signed with the URL, so the download name cannot be changed by the client
+				url += "?response-content-disposition=" + quote(f"filename={file_name}")
+			return cloudfront_signed_url(self.config, url, expiry)
+		bucket = self._bucket(bucket_type)
 		params = {"Bucket": bucket, "Key": key}
 		if file_name:
 			params["ResponseContentDisposition"] = f"filename={file_name}"
 		return self.client.generate_presigned_url("get_object", Params=params, ExpiresIn=expiry)
 
 	def get_public_url(self, key):
+		domain = get_cdn_domain(self.config, "public")
+		if domain:
+			return cdn_url(domain, key)
 		bucket = self._bucket("public")
 		endpoint = self.client.meta.endpoint_url
 		return f"{endpoint}/{bucket}/{key}"
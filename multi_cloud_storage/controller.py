@@ -7,7 +7,9 @@ from urllib.parse import quote
 
 import frappe
 
+from .backends.cdn import get_cdn_base_url
 from .backends.gcs_backend import GCSBackend
+from .backends.ratelimit import BULK, get_limiter
 from .backends.s3_backend import S3Backend
 
 
@@ -38,16 +40,30 @@ def _get_content_type(file_path):
 		return "application/octet-stream"
 
 
+CLOUD_FILE_URL_PATTERN = re.compile(
+	r"^(?:https?://.*\.s3\.amazonaws\.com/"
+	r"|/api/method/multi_cloud_storage\.controller\.generate_file"
+	r"|https://storage\.googleapis\.com/"
+	r"|https://storage\.cloud\.google\.com/)"
+)
+
+
 def _is_cloud_file_url(file_url):
 	if not file_url:
 		return False
-	patterns = [
-		r"^https?://.*\.s3\.amazonaws\.com/",
-		r"^/api/method/multi_cloud_storage\.controller\.generate_file",
-		r"^https://storage\.googleapis\.com/",
-		r"^https://storage\.cloud\.google\.com/",
+	if CLOUD_FILE_URL_PATTERN.match(file_url):
+		return True
+	return any(file_url.startswith(base + "/") for base in _get_cdn_base_urls())
+
+
+def _get_cdn_base_urls():
+	if not frappe.db.get_single_value("Cloud Storage Configuration", "enable_cdn"):
+		return []
+	domains = [
+		frappe.db.get_single_value("Cloud Storage Configuration", "cdn_public_domain"),
+		frappe.db.get_single_value("Cloud Storage Configuration", "cdn_private_domain"),
 	]
-	return any(re.match(p, file_url) for p in patterns)
+	return [get_cdn_base_url(d.strip().rstrip("/")) for d in domains if d and d.strip()]
 
 
 def _is_local_file_url(file_url):
@@ -58,6 +74,17 @@ def _is_local_file_url(file_url):
 
 CONTENT_HASH_PRIVATE = "private:"
 CONTENT_HASH_PUBLIC = "public:"
+ACCESS_COUNT_KEY = "multi_cloud_storage:access_count"
+ACCESS_LAST_KEY = "multi_cloud_storage:access_last"
+STATE_LOCAL = "Local"
+STATE_PENDING = "Pending"
+STATE_CLOUD = "Cloud"
+STATE_FAILED = "Failed"
+# the row points at no local file and no cloud object, e.g. after a shared object was deleted
+STATE_MISSING = "Missing"
+MIGRATION_STATES = (STATE_LOCAL, STATE_PENDING, STATE_FAILED)
+MIGRATION_BATCH_SIZE = 500
+DERIVATIVE_CONTENT_TYPES = ("image/jpeg", "image/png", "image/webp", "image/gif", "image/bmp", "image/tiff")
 
 
 def _parse_content_hash(content_hash):
@@ -71,25 +98,54 @@ def _parse_content_hash(content_hash):
 	return s.strip(), "private"
 
 
+def get_cloud_file_url(backend, key, content_hash, file_name, is_private, fallback=None):
+	if is_private:
+		return f"/api/method/multi_cloud_storage.controller.generate_file?key={quote(content_hash)}&file_name={quote(file_name or '')}"
+	return backend.get_public_url(key) if hasattr(backend, "get_public_url") else fallback
+
+
+def _set_storage_state(names, state, provider=None):
+	if isinstance(names, str):
+		names = [names]
+	if not names:
+		return
+	frappe.db.sql(
+		f"""UPDATE `tabFile` SET cloud_storage_state=%s,
+		cloud_storage_provider=COALESCE(%s, cloud_storage_provider)
+		WHERE name IN ({", ".join(["%s"] * len(names))})""",
+		[state, provider, *names],
+	)
+
+
 def file_upload_to_cloud(doc, method=None):
-	if doc.attached_to_doctype == "Prepared Report":
+	if _upload_new_file(doc):
 		return
+	if _is_local_file_url(doc.file_url):
+		_set_storage_state(doc.name, STATE_LOCAL)
+	elif _is_cloud_file_url(doc.file_url) and doc.content_hash:
+		config = get_config()
+		_set_storage_state(doc.name, STATE_CLOUD, config.storage_provider if config else None)
+
+
+def _upload_new_file(doc):
+	if doc.attached_to_doctype == "Prepared Report":
+		return False
 	backend = get_backend()
 	if not backend:
-		return
+		return False
 	ignore_doctypes = frappe.local.conf.get("ignore_multi_cloud_storage_doctype") or ["Data Import"]
 	if doc.attached_to_doctype in ignore_doctypes:
-		return
+		return False
 	site_path = frappe.utils.get_site_path()
 	path = doc.file_url
 	if not path or _is_cloud_file_url(path):
-		return
+		return False
 	if doc.is_private:
 		file_path = os.path.join(site_path, path.lstrip("/"))
 	else:
 		file_path = os.path.join(site_path, "public", path.lstrip("/"))
 	if not os.path.isfile(file_path):
-		return
+		return False
 	parent_doctype = doc.attached_to_doctype or "File"
 	parent_name = doc.attached_to_name or ""
 	if hasattr(backend, "key_generator"):
@@ -100,21 +156,60 @@ def file_upload_to_cloud(doc, method=None):
 	backend.upload(file_path, key, content_type, doc.is_private, doc.file_name)
 	prefix = CONTENT_HASH_PRIVATE if doc.is_private else CONTENT_HASH_PUBLIC
 	content_hash = prefix + key
-	if doc.is_private:
-		file_url = f"/api/method/multi_cloud_storage.controller.generate_file?key={quote(content_hash)}&file_name={quote(doc.file_name or '')}"
-	else:
-		file_url = backend.get_public_url(key) if hasattr(backend, "get_public_url") else path
+	file_url = get_cloud_file_url(backend, key, content_hash, doc.file_name, doc.is_private, path)
 	try:
 		os.remove(file_path)
 	except OSError:
 		pass
 	frappe.db.sql(
-		"""UPDATE `tabFile` SET file_url=%s, folder=%s, old_parent=%s, content_hash=%s
+		"""UPDATE `tabFile` SET file_url=%s, folder=%s, old_parent=%s, content_hash=%s,
+		cloud_storage_state=%s, cloud_storage_provider=%s
 		WHERE name=%s""",
-		(file_url, "Home/Attachments", "Home/Attachments", content_hash, doc.name),
+		(
+			file_url,
+			"Home/Attachments",
+			"Home/Attachments",
+			content_hash,
+			STATE_CLOUD,
+			backend.config.storage_provider,
+			doc.name,
+		),
 	)
+	_enqueue_derivatives(doc.name, content_type)
 	doc.file_url = file_url
 	doc.content_hash = content_hash
+	return True
+
+
+def _enqueue_derivatives(file_name, content_type):
+	if content_type not in DERIVATIVE_CONTENT_TYPES:
+		return
+	frappe.enqueue(
+		"multi_cloud_storage.derivatives.generate_derivatives",
+		queue="short",
+		enqueue_after_commit=True,
+		file_name=file_name,
+	)
+
+
+def _get_derivative_key(content_hash, key, size):
+	derivatives = frappe.db.get_value("File", {"content_hash": content_hash}, "cloud_derivatives")
+	for entry in (derivatives or "").split(","):
+		if entry.split(".", 1)[0] == size:
+			return f"{key}.{entry}"
+	return key
+
+
+def record_access(content_hash):
+	if not content_hash:
+		return
+	try:
+		pipe = frappe.cache.pipeline(transaction=False)
+		pipe.hincrby(frappe.cache.make_key(ACCESS_COUNT_KEY), content_hash, 1)
+		pipe.hset(frappe.cache.make_key(ACCESS_LAST_KEY), content_hash, frappe.utils.now())
+		pipe.execute()
+	except Exception:
+		pass
 
 
 def delete_from_cloud(doc, method=None):
@@ -125,10 +220,18 @@ def delete_from_cloud(doc, method=None):
 	if not key:
 		return
 	backend.delete(key, bucket_type)
+	for entry in (doc.get("cloud_derivatives") or "").split(","):
+		if entry:
+			backend.delete(f"{key}.{entry}", bucket_type)
+	if backend.config.delete_file_from_cloud:
+		shared = frappe.get_all(
+			"File", filters={"content_hash": doc.content_hash, "name": ["!=", doc.name]}, pluck="name"
+		)
+		_set_storage_state(shared, STATE_MISSING)
 
 
 @frappe.whitelist()
-def generate_file(key=None, file_name=None):
+def generate_file(key=None, file_name=None, size=None):
 	if not key:
 		frappe.local.response["body"] = "Key not found."
 		return
@@ -136,12 +239,16 @@ def generate_file(key=None, file_name=None):
 	if not backend:
 		frappe.throw(frappe._("MultiCloud Storage is not enabled"))
 	parsed_key, bucket_type = _parse_content_hash(key)
-	url = backend.get_url(parsed_key, file_name, bucket_type)
+	object_key = _get_derivative_key(key, parsed_key, size) if size else parsed_key
+	url = backend.get_url(object_key, file_name, bucket_type)
+	# serving a derivative is not a read of the original and must not keep it out of cold storage
+	if object_key == parsed_key:
+		record_access(key)
 	frappe.local.response["type"] = "redirect"
 	frappe.local.response["location"] = url
 
 
-def _upload_existing_file(file_doc):
+def _upload_existing_file(file_doc, derivatives=None):
 	backend = get_backend()
 	if not backend:
 		return False
@@ -167,66 +274,103 @@ def _upload_existing_file(file_doc):
 	backend.upload(file_path, key, content_type, doc.is_private, doc.file_name)
 	prefix = CONTENT_HASH_PRIVATE if doc.is_private else CONTENT_HASH_PUBLIC
 	content_hash = prefix + key
-	if doc.is_private:
-		file_url = f"/api/method/multi_cloud_storage.controller.generate_file?key={quote(content_hash)}&file_name={quote(doc.file_name or '')}"
-	else:
-		file_url = backend.get_public_url(key) if hasattr(backend, "get_public_url") else doc.file_url
+	file_url = get_cloud_file_url(backend, key, content_hash, doc.file_name, doc.is_private, doc.file_url)
 	try:
 		os.remove(file_path)
 	except OSError:
 		pass
 	frappe.db.sql(
-		"""UPDATE `tabFile` SET file_url=%s, folder=%s, old_parent=%s, content_hash=%s
+		"""UPDATE `tabFile` SET file_url=%s, folder=%s, old_parent=%s, content_hash=%s,
+		cloud_storage_state=%s, cloud_storage_provider=%s
 		WHERE name=%s""",
-		(file_url, "Home/Attachments", "Home/Attachments", content_hash, doc.name),
+		(
+			file_url,
+			"Home/Attachments",
+			"Home/Attachments",
+			content_hash,
+			STATE_CLOUD,
+			backend.config.storage_provider,
+			doc.name,
+		),
 	)
+	if derivatives is None:
+		_enqueue_derivatives(doc.name, content_type)
+	elif content_type in DERIVATIVE_CONTENT_TYPES:
+		derivatives.append(doc.name)
 	frappe.db.commit()
 	return True
 
 
+def _get_settled_state(doc, config):
+	if _is_cloud_file_url(doc.file_url) and doc.content_hash:
+		return STATE_CLOUD, config.storage_provider
+	return STATE_MISSING, None
+
+
 @frappe.whitelist()
 def migrate_existing_files():
 	config = get_config()
 	if not config:
 		frappe.throw(frappe._("MultiCloud Storage is not enabled"))
-	files = frappe.get_all(
-		"File",
-		filters={"is_folder": 0},
-		fields=["name", "file_url", "file_name", "is_private", "attached_to_doctype", "attached_to_name"],
-	)
+	frappe.flags.cloud_storage_priority = BULK
+	total = frappe.db.count("File", {"is_folder": 0})
+	skipped_no_url_or_cloud = frappe.db.count("File", {"is_folder": 0, "cloud_storage_state": STATE_CLOUD})
+	scanned = 0
 	migrated = 0
-	skipped_no_url_or_cloud = 0
 	skipped_not_local = 0
 	skipped_file_not_found = 0
 	skipped_other = 0
 	errors = []
-	for f in files:
-		file_url = f.get("file_url")
-		if not file_url or _is_cloud_file_url(file_url):
-			skipped_no_url_or_cloud += 1
-			continue
-		if not _is_local_file_url(file_url):
-			skipped_not_local += 1
-			continue
-		try:
-			doc = frappe.get_doc("File", f["name"])
-			result = _upload_existing_file(doc)
-			if result is True:
-				migrated += 1
-			elif result == "file_not_found":
-				skipped_file_not_found += 1
-			else:
+	last_name = ""
+	while True:
+		names = frappe.db.sql(
+			"""SELECT name FROM `tabFile`
+			WHERE cloud_storage_state IN (%s, %s, %s) AND is_folder=0 AND name > %s
+			ORDER BY name
+			LIMIT %s""",
+			(*MIGRATION_STATES, last_name, MIGRATION_BATCH_SIZE),
+			pluck=True,
+		)
+		if not names:
+			break
+		last_name = names[-1]
+		_set_storage_state(names, STATE_PENDING)
+		frappe.db.commit()
+		derivatives = []
+		for name in names:
+			scanned += 1
+			try:
+				doc = frappe.get_doc("File", name)
+				result = _upload_existing_file(doc, derivatives)
+				if result is True:
+					migrated += 1
+				elif result == "file_not_found":
+					skipped_file_not_found += 1
+					_set_storage_state(name, STATE_FAILED)
+				else:
+					skipped_not_local += 1
+					_set_storage_state(name, *_get_settled_state(doc, config))
+			except Exception as e:
+				frappe.db.rollback()
 				skipped_other += 1
-		except Exception as e:
-			skipped_other += 1
-			errors.append({"file": f["name"], "error": str(e)})
-			frappe.log_error(
-				title=f"MultiCloud Storage migrate: {f.get('name')}",
-				message=frappe.get_traceback(),
+				errors.append({"file": name, "error": str(e)})
+				_set_storage_state(name, STATE_FAILED)
+				frappe.log_error(
+					title=f"MultiCloud Storage migrate: {name}",
+					message=frappe.get_traceback(),
+				)
+			frappe.db.commit()
+		# one long-queue job per batch, so a migration does not flood the short queue
+		if derivatives:
+			frappe.enqueue(
+				"multi_cloud_storage.derivatives.generate_derivatives_batch",
+				queue="long",
+				file_names=derivatives,
 			)
+	skipped_not_local += max(total - skipped_no_url_or_cloud - scanned, 0)
 	return {
 		"migrated": migrated,
-		"total": len(files),
+		"total": total,
 		"skipped": skipped_no_url_or_cloud + skipped_not_local + skipped_file_not_found + skipped_other,
 		"skipped_no_url_or_cloud": skipped_no_url_or_cloud,
 		"skipped_not_local_url": skipped_not_local,
@@ -236,6 +380,21 @@ def migrate_existing_files():
 	}
 
 
+@frappe.whitelist()
+def get_storage_state_report():
+	frappe.only_for("System Manager")
+	return frappe.db.sql(
+		"""SELECT COALESCE(NULLIF(cloud_storage_state, ''), 'Unknown') AS state,
+			COALESCE(cloud_storage_provider, '') AS provider,
+			COUNT(*) AS files, COALESCE(SUM(file_size), 0) AS bytes
+		FROM `tabFile`
+		WHERE is_folder=0
+		GROUP BY 1, 2
+		ORDER BY 1, 2""",
+		as_dict=True,
+	)
+
+
 @frappe.whitelist()
 def test_connection():
 	config = get_config()
@@ -248,3 +407,13 @@ def test_connection():
 	if ok:
 		return {"success": True, "message": frappe._("Connection successful")}
 	return {"success": False, "message": err or frappe._("Connection failed")}
+
+
+@frappe.whitelist()
+def get_rate_limit_utilisation():
+	frappe.only_for("System Manager")
+	config = get_config()
+	limiter = get_limiter(config) if config else None
+	if not limiter:
+		return {"enabled": False}
+	return {"enabled": True, **limiter.get_utilisation()}
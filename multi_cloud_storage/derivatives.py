@@ -0,0 +1,79 @@
+# Copyright (c) 2026, Bhushan Barbuddhe and contributors
+# For license information, please see license.txt
+
+import io
+
+import frappe
+from PIL import Image, ImageOps, features
+
+from .controller import _parse_content_hash, get_backend
+
+DEFAULT_DERIVATIVE_SIZES = {"thumbnail": 160, "small": 480, "medium": 1024}
+MAX_SOURCE_BYTES = 50 * 1024 * 1024
+
+
+def get_derivative_sizes():
+	return frappe.local.conf.get("multi_cloud_storage_derivative_sizes") or DEFAULT_DERIVATIVE_SIZES
+
+
+def _get_output_format():
+	if features.check("webp"):
+		return "WEBP", "webp", "image/webp"
+	return "JPEG", "jpg", "image/jpeg"
+
+
+def _render(image, max_px, image_format):
+	derivative = image.copy()
+	derivative.thumbnail((max_px, max_px), Image.Resampling.LANCZOS)
+	if image_format == "JPEG" and derivative.mode not in ("RGB", "L"):
+		derivative = derivative.convert("RGB")
+	elif derivative.mode not in ("RGB", "RGBA", "L"):
+		derivative = derivative.convert("RGBA")
+	buf = io.BytesIO()
+	derivative.save(buf, format=image_format, quality=80, optimize=True)
+	buf.seek(0)
+	return buf
+
+
+def generate_derivatives(file_name):
+	backend = get_backend()
+	if not backend or not hasattr(backend, "stream_reader") or not hasattr(backend, "upload_fileobj"):
+		return
+	doc = frappe.db.get_value("File", file_name, ["content_hash", "file_size", "is_private"], as_dict=True)
+	if not doc or not doc.content_hash:
+		return
+	if (doc.file_size or 0) > MAX_SOURCE_BYTES:
+		return
+	key, bucket_type = _parse_content_hash(doc.content_hash)
+	if not key:
+		return
+	read = backend.stream_reader(bucket_type)
+	image_format, ext, content_type = _get_output_format()
+	entries = []
+	try:
+		with Image.open(io.BytesIO(b"".join(read(key)))) as image:
+			image = ImageOps.exif_transpose(image)
+			for size, max_px in sorted(get_derivative_sizes().items(), key=lambda s: s[1]):
+				if max(image.size) <= max_px:
+					break
+				entry = f"{size}.{ext}"
+				backend.upload_fileobj(
+					_render(image, max_px, image_format),
+					f"{key}.{entry}",
+					content_type,
+					bucket_type == "private",
+				)
+				entries.append(entry)
+	except Exception:
+		frappe.log_error(
+			title=f"MultiCloud Storage derivatives: {file_name}",
+			message=frappe.get_traceback(),
+		)
+	if entries:
+		frappe.db.set_value("File", file_name, "cloud_derivatives", ",".join(entries), update_modified=False)
+
+
+def generate_derivatives_batch(file_names):
+	for file_name in file_names:
+		generate_derivatives(file_name)
+		frappe.db.commit()
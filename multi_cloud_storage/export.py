@@ -0,0 +1,277 @@
+# Copyright (c) 2026, Bhushan Barbuddhe and contributors
+# For license information, please see license.txt
+
+import io
+import os
+import queue
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import frappe
+from werkzeug.wrappers import Response
+
+from .controller import (
+	CONTENT_HASH_PRIVATE,
+	CONTENT_HASH_PUBLIC,
+	STATE_CLOUD,
+	_parse_content_hash,
+	get_backend,
+	get_cloud_file_url,
+)
+
+EXPORT_WORKERS = 4
+EXPORT_QUEUE_CHUNKS = 4
+EXPORT_CHUNK_SIZE = 1024 * 1024
+_EOF = object()
+
+
+class _ZipBuffer(io.RawIOBase):
+	def __init__(self):
+		self._chunks = []
+
+	def writable(self):
+		return True
+
+	def write(self, b):
+		self._chunks.append(bytes(b))
+		return len(b)
+
+	def drain(self):
+		data = b"".join(self._chunks)
+		self._chunks.clear()
+		return data
+
+
+class _IterReader(io.RawIOBase):
+	def __init__(self, iterable):
+		self._it = iter(iterable)
+		self._pending = b""
+		self.size = 0
+
+	def readable(self):
+		return True
+
+	def readinto(self, b):
+		while not self._pending:
+			chunk = next(self._it, None)
+			if chunk is None:
+				return 0
+			self._pending = chunk
+			self.size += len(chunk)
+		n = min(len(b), len(self._pending))
+		b[:n] = self._pending[:n]
+		self._pending = self._pending[n:]
+		return n
+
+
+def _get_attachments(doctype, names):
+	if not names:
+		return []
+	files = frappe.db.sql(
+		f"""SELECT name, file_name, content_hash, attached_to_name FROM `tabFile`
+		WHERE attached_to_doctype=%s AND is_folder=0
+		AND attached_to_name IN ({", ".join(["%s"] * len(names))})
+		AND (content_hash LIKE %s OR content_hash LIKE %s)
+		ORDER BY attached_to_name, creation""",
+		[doctype, *names, CONTENT_HASH_PRIVATE + "%", CONTENT_HASH_PUBLIC + "%"],
+		as_dict=True,
+	)
+	items = []
+	seen = set()
+	for f in files:
+		key, bucket_type = _parse_content_hash(f.content_hash)
+		if not key:
+			continue
+		arcname = _unique_arcname(f"{f.attached_to_name}/{f.file_name or os.path.basename(key)}", seen)
+		items.append(frappe._dict(key=key, bucket_type=bucket_type, arcname=arcname))
+	return items
+
+
+def _unique_arcname(arcname, seen):
+	arcname = arcname.replace("\\", "_").lstrip("/")
+	base, ext = os.path.splitext(arcname)
+	candidate = arcname
+	i = 1
+	while candidate in seen:
+		candidate = f"{base} ({i}){ext}"
+		i += 1
+	seen.add(candidate)
+	return candidate
+
+
+def _get_parent_names(doctype, names=None, filters=None):
+	names = frappe.parse_json(names) if names else None
+	filters = frappe.parse_json(filters) if filters else {}
+	if names:
+		filters = [*_as_filter_list(doctype, filters), [doctype, "name", "in", names]]
+	return frappe.get_list(doctype, filters=filters, pluck="name", limit_page_length=0)
+
+
+def _as_filter_list(doctype, filters):
+	if isinstance(filters, dict):
+		return [[doctype, k, "=", v] for k, v in filters.items()]
+	return list(filters or [])
+
+
+def _put(q, item, cancelled):
+	while not cancelled.is_set():
+		try:
+			q.put(item, timeout=1)
+			return True
+		except queue.Full:
+			continue
+	return False
+
+
+def _fetch(read, key, q, cancelled):
+	try:
+		for chunk in read(key):
+			if not _put(q, chunk, cancelled):
+				return
+		_put(q, _EOF, cancelled)
+	except Exception as e:
+		_put(q, e, cancelled)
+
+
+def _iter_zip(readers, items):
+	buf = _ZipBuffer()
+	cancelled = threading.Event()
+	pool = ThreadPoolExecutor(max_workers=EXPORT_WORKERS)
+	pending = iter(items)
+	in_flight = deque()
+	errors = []
+
+	def submit_next():
+		item = next(pending, None)
+		if item is None:
+			return
+		q = queue.Queue(maxsize=EXPORT_QUEUE_CHUNKS)
+		pool.submit(_fetch, readers[item.bucket_type], item.key, q, cancelled)
+		in_flight.append((item, q))
+
+	try:
+		with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+			for _ in range(EXPORT_WORKERS):
+				submit_next()
+			while in_flight:
+				item, q = in_flight.popleft()
+				chunk = q.get()
+				if isinstance(chunk, Exception):
+					errors.append(f"{item.arcname}: {chunk}")
+				else:
+					info = zipfile.ZipInfo(item.arcname, date_time=time.localtime()[:6])
+					info.compress_type = zipfile.ZIP_DEFLATED
+					with zf.open(info, "w", force_zip64=True) as entry:
+						while chunk is not _EOF:
+							if isinstance(chunk, Exception):
+								errors.append(f"{item.arcname}: incomplete, {chunk}")
+								break
+							entry.write(chunk)
+							data = buf.drain()
+							if data:
+								yield data
+							chunk = q.get()
+				submit_next()
+			if errors:
+				zf.writestr("_errors.txt", "\n".join(errors))
+		yield buf.drain()
+	finally:
+		cancelled.set()
+		pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _get_readers(backend, items):
+	if not hasattr(backend, "stream_reader"):
+		frappe.throw(frappe._("Storage provider does not support ZIP export"))
+	return {
+		bucket_type: backend.stream_reader(bucket_type, EXPORT_CHUNK_SIZE)
+		for bucket_type in {item.bucket_type for item in items}
+	}
+
+
+@frappe.whitelist()
+def download_attachments(doctype, names=None, filters=None):
+	backend = get_backend()
+	if not backend:
+		frappe.throw(frappe._("MultiCloud Storage is not enabled"))
+	items = _get_attachments(doctype, _get_parent_names(doctype, names, filters))
+	if not items:
+		frappe.throw(frappe._("No cloud attachments found"))
+	readers = _get_readers(backend, items)
+	file_name = f"{frappe.scrub(doctype)}_attachments.zip"
+	return Response(
+		_iter_zip(readers, items),
+		mimetype="application/zip",
+		headers={"Content-Disposition": f"attachment; filename*=UTF-8''{quote(file_name)}"},
+		direct_passthrough=True,
+	)
+
+
+@frappe.whitelist()
+def export_attachments(doctype, names=None, filters=None):
+	if not get_backend():
+		frappe.throw(frappe._("MultiCloud Storage is not enabled"))
+	parent_names = _get_parent_names(doctype, names, filters)
+	if not parent_names:
+		frappe.throw(frappe._("No documents found"))
+	frappe.enqueue(
+		"multi_cloud_storage.export.build_attachments_zip",
+		queue="long",
+		timeout=6 * 60 * 60,
+		doctype=doctype,
+		names=parent_names,
+		user=frappe.session.user,
+	)
+	return {"queued": True, "documents": len(parent_names)}
+
+
+def build_attachments_zip(doctype, names, user):
+	backend = get_backend()
+	if not backend:
+		return
+	items = _get_attachments(doctype, names)
+	if not items:
+		frappe.publish_realtime("msgprint", frappe._("No cloud attachments found"), user=user)
+		return
+	readers = _get_readers(backend, items)
+	file_name = f"{frappe.scrub(doctype)}_attachments_{frappe.utils.now_datetime():%Y%m%d%H%M%S}.zip"
+	if hasattr(backend, "key_generator"):
+		key = backend.key_generator(file_name, doctype, "")
+	else:
+		key = f"{doctype}/{file_name}"
+	reader = _IterReader(_iter_zip(readers, items))
+	backend.upload_fileobj(
+		io.BufferedReader(reader, buffer_size=EXPORT_CHUNK_SIZE), key, "application/zip", True, file_name
+	)
+	content_hash = CONTENT_HASH_PRIVATE + key
+	url = get_cloud_file_url(backend, key, content_hash, file_name, True)
+	# a File row owned by the user, so deleting it removes the object like any other attachment
+	file_doc = frappe.get_doc(
+		{
+			"doctype": "File",
+			"file_name": file_name,
+			"file_url": url,
+			"file_size": reader.size,
+			"file_type": "ZIP",
+			"is_private": 1,
+			"folder": "Home/Attachments",
+			"attached_to_doctype": "User",
+			"attached_to_name": user,
+			"content_hash": content_hash,
+			"cloud_storage_state": STATE_CLOUD,
+			"cloud_storage_provider": backend.config.storage_provider,
+			"owner": user,
+		}
+	)
+	# db_insert skips File validation, which rejects file_url values outside /files and /private/files
+	file_doc.db_insert()
+	frappe.db.commit()
+	frappe.publish_realtime(
+		"msgprint",
+		frappe._("Attachment export is ready: {0}").format(f'<a href="{url}">{file_name}</a>'),
+		user=user,
+	)
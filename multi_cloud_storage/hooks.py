@@ -86,7 +86,8 @@ app_license = "mit"
 # ------------
 
 # before_install = "multi_cloud_storage.install.before_install"
-# after_install = "multi_cloud_storage.install.after_install"
+after_install = "multi_cloud_storage.install.after_install"
+after_migrate = "multi_cloud_storage.install.after_migrate"
 
 # Uninstallation
 # ------------
@@ -141,6 +142,15 @@ doc_events = {
 # Scheduled Tasks
 # ---------------
 
+scheduler_events = {
+	"all": [
+		"multi_cloud_storage.tiering.flush_access_log",
+	],
+	"daily_long": [
+		"multi_cloud_storage.tiering.move_cold_files",
+	],
+}
+
 # scheduler_events = {
 # 	"all": [
 # 		"multi_cloud_storage.tasks.all"
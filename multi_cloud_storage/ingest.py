@@ -0,0 +1,235 @@
+# Copyright (c) 2026, Bhushan Barbuddhe and contributors
+# For license information, please see license.txt
+
+import base64
+import io
+import mimetypes
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import frappe
+from frappe.handler import ALLOWED_MIMETYPES
+from frappe.utils import cint
+
+from .controller import (
+	CONTENT_HASH_PRIVATE,
+	CONTENT_HASH_PUBLIC,
+	STATE_CLOUD,
+	_enqueue_derivatives,
+	get_backend,
+	get_cloud_file_url,
+)
+
+INGEST_WORKERS = 16
+INGEST_MAX_FILES = 1000
+SNIFF_BYTES = 2048
+FILE_FIELDS = (
+	"name",
+	"creation",
+	"modified",
+	"owner",
+	"modified_by",
+	"docstatus",
+	"idx",
+	"file_name",
+	"file_url",
+	"is_private",
+	"is_folder",
+	"folder",
+	"old_parent",
+	"attached_to_doctype",
+	"attached_to_name",
+	"attached_to_field",
+	"file_size",
+	"file_type",
+	"content_hash",
+	"cloud_storage_state",
+	"cloud_storage_provider",
+)
+
+
+def _get_max_file_size():
+	return cint(frappe.conf.get("max_file_size")) or 25 * 1024 * 1024
+
+
+def _get_content_type(file_name, content):
+	try:
+		import magic
+
+		return magic.from_buffer(content[:SNIFF_BYTES], mime=True)
+	except Exception:
+		return mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+
+
+def _read_items(files, is_private):
+	items = []
+	request_files = getattr(frappe.request, "files", None) if frappe.request else None
+	if request_files:
+		for _field, f in request_files.items(multi=True):
+			items.append(frappe._dict(file_name=f.filename, content=f.stream.read(), is_private=is_private))
+	for f in frappe.parse_json(files) or []:
+		item = frappe._dict(file_name=f.get("file_name"), is_private=cint(f.get("is_private", is_private)))
+		try:
+			item.content = base64.b64decode(f.get("content") or "", validate=True)
+		except ValueError:
+			item.error = frappe._("Invalid base64 content")
+		items.append(item)
+	return items
+
+
+def _validate_item(item, max_size):
+	if item.error:
+		return
+	item.file_name = os.path.basename((item.file_name or "").strip())
+	if not item.file_name:
+		item.error = frappe._("File name is required")
+	elif len(item.content) > max_size:
+		item.error = frappe._("File size exceeds the maximum allowed size of {0} MB").format(
+			max_size // (1024 * 1024)
+		)
+
+
+def _validate_file_type(item, doctype, name, restrict_mimetypes):
+	if restrict_mimetypes and mimetypes.guess_type(item.file_name)[0] not in ALLOWED_MIMETYPES:
+		item.error = frappe._("You can only upload JPG, PNG, PDF, TXT, CSV or Microsoft documents.")
+		return
+	# run the checks File runs before insert, which bulk_insert would skip
+	doc = frappe.get_doc(
+		{
+			"doctype": "File",
+			"file_name": item.file_name,
+			"is_private": item.is_private,
+			"attached_to_doctype": doctype,
+			"attached_to_name": name,
+		}
+	)
+	try:
+		doc.set_file_type()
+		doc.validate_file_extension()
+	except frappe.ValidationError as e:
+		frappe.clear_last_message()
+		item.error = str(e) or e.__class__.__name__
+		return
+	item.file_type = doc.file_type
+
+
+def _get_remaining_attachments(doctype, name):
+	limit = cint(frappe.get_meta(doctype).max_attachments)
+	if not limit:
+		return None
+	return max(limit - frappe.db.count("File", {"attached_to_doctype": doctype, "attached_to_name": name}), 0)
+
+
+def _upload_item(upload, item):
+	try:
+		upload(io.BytesIO(item.content), item.key, item.content_type, item.file_name, len(item.content))
+	except Exception as e:
+		item.error = str(e) or e.__class__.__name__
+
+
+@frappe.whitelist(methods=["POST"])
+def bulk_ingest(doctype, name, files=None, is_private=1, attached_to_field=None):
+	frappe.has_permission(doctype, "write", name, throw=True)
+	backend = get_backend()
+	if not backend or not hasattr(backend, "get_uploader"):
+		frappe.throw(frappe._("MultiCloud Storage is not enabled"))
+	items = _read_items(files, cint(is_private))
+	if not items:
+		frappe.throw(frappe._("No files to ingest"))
+	if len(items) > INGEST_MAX_FILES:
+		frappe.throw(frappe._("At most {0} files can be ingested at once").format(INGEST_MAX_FILES))
+
+	max_size = _get_max_file_size()
+	restrict_mimetypes = not frappe.get_cached_doc("User", frappe.session.user).has_desk_access()
+	remaining = _get_remaining_attachments(doctype, name)
+	uploaders = {}
+	pending = []
+	for item in items:
+		_validate_item(item, max_size)
+		if not item.error:
+			_validate_file_type(item, doctype, name, restrict_mimetypes)
+		if not item.error and remaining is not None:
+			if remaining > 0:
+				remaining -= 1
+			else:
+				item.error = frappe._("Maximum Attachment Limit of {0} has been reached for {1} {2}.").format(
+					frappe.get_meta(doctype).max_attachments, doctype, name
+				)
+		if item.error:
+			continue
+		if hasattr(backend, "key_generator"):
+			item.key = backend.key_generator(item.file_name, doctype, name)
+		else:
+			item.key = f"{doctype}/{item.file_name}"
+		item.content_type = _get_content_type(item.file_name, item.content)
+		if item.is_private not in uploaders:
+			uploaders[item.is_private] = backend.get_uploader(item.is_private)
+		pending.append(item)
+
+	with ThreadPoolExecutor(max_workers=INGEST_WORKERS) as pool:
+		for item in pending:
+			pool.submit(_upload_item, uploaders[item.is_private], item)
+
+	now = frappe.utils.now()
+	user = frappe.session.user
+	provider = backend.config.storage_provider
+	rows = []
+	for item in pending:
+		if item.error:
+			continue
+		prefix = CONTENT_HASH_PRIVATE if item.is_private else CONTENT_HASH_PUBLIC
+		item.content_hash = prefix + item.key
+		item.name = frappe.generate_hash(length=10)
+		item.file_url = get_cloud_file_url(
+			backend, item.key, item.content_hash, item.file_name, item.is_private
+		)
+		rows.append(
+			(
+				item.name,
+				now,
+				now,
+				user,
+				user,
+				0,
+				0,
+				item.file_name,
+				item.file_url,
+				item.is_private,
+				0,
+				"Home/Attachments",
+				"Home/Attachments",
+				doctype,
+				name,
+				attached_to_field,
+				len(item.content),
+				item.file_type,
+				item.content_hash,
+				STATE_CLOUD,
+				provider,
+			)
+		)
+	try:
+		if rows:
+			frappe.db.bulk_insert("File", FILE_FIELDS, rows)
+	except Exception:
+		for item in pending:
+			if not item.error:
+				backend.delete(item.key, "private" if item.is_private else "public", force=True)
+		raise
+	for item in pending:
+		if not item.error:
+			_enqueue_derivatives(item.name, item.content_type)
+
+	results = []
+	for item in items:
+		if item.error:
+			results.append({"file_name": item.file_name, "success": False, "error": item.error})
+		else:
+			results.append(
+				{"file_name": item.file_name, "success": True, "name": item.name, "file_url": item.file_url}
+			)
+	return {
+		"uploaded": len(rows),
+		"failed": len(items) - len(rows),
+		"files": results,
+	}
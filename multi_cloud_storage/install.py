@@ -0,0 +1,111 @@
+# Copyright (c) 2026, Bhushan Barbuddhe and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.custom.doctype.custom_field.custom_field import create_custom_fields
+
+from .controller import CONTENT_HASH_PRIVATE, CONTENT_HASH_PUBLIC, STATE_CLOUD, STATE_LOCAL
+
+
+def get_custom_fields():
+	return {
+		"File": [
+			{
+				"fieldname": "cloud_storage_section",
+				"fieldtype": "Section Break",
+				"label": "Cloud Storage",
+				"insert_after": "content_hash",
+				"collapsible": 1,
+			},
+			{
+				"fieldname": "cloud_storage_state",
+				"fieldtype": "Select",
+				"label": "Cloud Storage State",
+				"options": "\nLocal\nPending\nCloud\nFailed\nMissing",
+				"insert_after": "cloud_storage_section",
+				"read_only": 1,
+				"no_copy": 1,
+				"search_index": 1,
+			},
+			{
+				"fieldname": "cloud_storage_provider",
+				"fieldtype": "Data",
+				"label": "Cloud Storage Provider",
+				"insert_after": "cloud_storage_state",
+				"read_only": 1,
+				"no_copy": 1,
+			},
+			{
+				"fieldname": "cloud_storage_class",
+				"fieldtype": "Data",
+				"label": "Cloud Storage Class",
+				"insert_after": "cloud_storage_provider",
+				"read_only": 1,
+				"no_copy": 1,
+			},
+			{
+				"fieldname": "cloud_access_count",
+				"fieldtype": "Int",
+				"label": "Cloud Access Count",
+				"insert_after": "cloud_storage_class",
+				"read_only": 1,
+				"no_copy": 1,
+			},
+			{
+				"fieldname": "cloud_last_accessed",
+				"fieldtype": "Datetime",
+				"label": "Cloud Last Accessed",
+				"insert_after": "cloud_access_count",
+				"read_only": 1,
+				"no_copy": 1,
+				"search_index": 1,
+			},
+			{
+				"fieldname": "cloud_tiering_failed",
+				"fieldtype": "Check",
+				"label": "Cloud Tiering Failed",
+				"insert_after": "cloud_last_accessed",
+				"read_only": 1,
+				"no_copy": 1,
+			},
+			{
+				"fieldname": "cloud_derivatives",
+				"fieldtype": "Small Text",
+				"label": "Cloud Derivatives",
+				"insert_after": "cloud_tiering_failed",
+				"read_only": 1,
+				"no_copy": 1,
+			},
+		]
+	}
+
+
+def make_custom_fields():
+	create_custom_fields(get_custom_fields(), ignore_validate=True, update=True)
+	frappe.db.add_index("File", ["content_hash"])
+
+
+def backfill_cloud_storage_state():
+	provider = frappe.db.get_single_value("Cloud Storage Configuration", "storage_provider")
+	frappe.db.sql(
+		"""UPDATE `tabFile` SET cloud_storage_state=%s, cloud_storage_provider=%s
+		WHERE COALESCE(cloud_storage_state, '')=''
+		AND (content_hash LIKE %s OR content_hash LIKE %s)""",
+		(STATE_CLOUD, provider, CONTENT_HASH_PRIVATE + "%", CONTENT_HASH_PUBLIC + "%"),
+	)
+	frappe.db.sql(
+		"""UPDATE `tabFile` SET cloud_storage_state=%s
+		WHERE COALESCE(cloud_storage_state, '')='' AND is_folder=0
+		AND (file_url LIKE %s OR file_url LIKE %s)""",
+		(STATE_LOCAL, "/files/%", "/private/files/%"),
+	)
+
+
+def after_install():
+	make_custom_fields()
+	# patches are marked as run on install, so existing files are backfilled here
+	backfill_cloud_storage_state()
+
+
+def after_migrate():
+	make_custom_fields()
@@ -32,6 +32,26 @@ frappe.ui.form.on("Cloud Storage Configuration", {
 			});
 		}).addClass("btn-primary");
 
+		frm.add_custom_button(__("Plan Migration"), () => {
+			frappe.call({
+				method: "multi_cloud_storage.planner.plan_migration",
+				callback(r) {
+					if (!r.message || !r.message.queued) return;
+					frappe.realtime.off("multi_cloud_storage_migration_plan");
+					frappe.realtime.on("multi_cloud_storage_migration_plan", (m) => {
+						frappe.realtime.off("multi_cloud_storage_migration_plan");
+						show_migration_plan(m);
+					});
+					frappe.show_alert({
+						message: __(
+							"Scanning files in the background. The plan will open when it is ready."
+						),
+						indicator: "blue",
+					});
+				},
+			});
+		});
+
 		frm.add_custom_button(__("Migrate Existing Files"), () => {
 			frappe.confirm(
 				__("Upload all local files (/files/ and /private/files/) to cloud. Continue?"),
@@ -90,5 +110,71 @@ frappe.ui.form.on("Cloud Storage Configuration", {
 				}
 			);
 		});
+
+		frm.add_custom_button(__("Storage Tier Report"), () => {
+			frappe.call({
+				method: "multi_cloud_storage.tiering.get_storage_tier_report",
+				callback(r) {
+					const rows = r.message || [];
+					if (!rows.length) {
+						frappe.msgprint(__("No files on cloud yet."));
+						return;
+					}
+					frappe.msgprint({
+						title: __("Storage Tier Report"),
+						message: rows
+							.map(
+								(row) =>
+									`${row.storage_class}: ${row.files} ` +
+									__("file(s)") +
+									`, ${frappe.form.formatters.FileSize(row.bytes)}`
+							)
+							.join("<br>"),
+						indicator: "blue",
+					});
+				},
+			});
+		});
 	},
 });
+
+function show_migration_plan(m) {
+	if (m.error) {
+		frappe.msgprint({
+			title: __("Migration Plan Failed"),
+			message: m.error,
+			indicator: "red",
+		});
+		return;
+	}
+	const size = (bytes) => frappe.form.formatters.FileSize(bytes);
+	const lines = [
+		__("Files on disk:") + ` ${m.files_on_disk} (${size(m.bytes_on_disk)})`,
+		__("To migrate:") + ` ${m.files_to_migrate} (${size(m.bytes_to_migrate)})`,
+		...m.size_bands.map((b) => `&nbsp;&nbsp;${b.band}: ${b.files} (${size(b.bytes)})`),
+		__("Missing on disk:") + ` ${m.missing_files}`,
+		__("Not referenced by any File:") +
+			` ${m.unreferenced_files} (${size(m.unreferenced_bytes)})`,
+	];
+	if (m.estimated_seconds !== undefined) {
+		lines.push(
+			__("Measured throughput:") +
+				` ${size(m.throughput_bytes_per_second)}/s, ` +
+				__("latency:") +
+				` ${m.request_latency_seconds}s`
+		);
+		lines.push(
+			__("Estimated migration time:") +
+				" " +
+				frappe.utils.get_formatted_duration(m.estimated_seconds)
+		);
+	}
+	if (m.probe_error) {
+		lines.push(__("Throughput probe failed, no time estimate:") + ` ${m.probe_error}`);
+	}
+	frappe.msgprint({
+		title: __("Migration Plan"),
+		message: lines.join("<br>"),
+		indicator: "blue",
+	});
+}
@@ -4,6 +4,8 @@
 import frappe
 from frappe.model.document import Document
 
+from multi_cloud_storage.tiering import COLD_STORAGE_CLASSES
+
 SECRET_PLACEHOLDER = "********"
 
 
@@ -30,6 +32,24 @@ class CloudStorageConfiguration(Document):
 			if not (self.gcs_public_bucket_name or "").strip():
 				frappe.throw(frappe._("GCS Public Bucket Name is required"))
 			self._validate_and_encrypt_gcs_json()
+		if self.enable_storage_tiering:
+			self._validate_cold_storage_class()
+		if self.enable_cdn:
+			self._validate_and_encrypt_cdn_key()
+
+	def on_update(self):
+		# files flagged under another class may have failed because of that class
+		if self.has_value_changed("cold_storage_class"):
+			frappe.db.sql("UPDATE `tabFile` SET cloud_tiering_failed=0 WHERE cloud_tiering_failed=1")
+
+	def _validate_cold_storage_class(self):
+		allowed = COLD_STORAGE_CLASSES.get(self.storage_provider, ())
+		if self.cold_storage_class not in allowed:
+			frappe.throw(
+				frappe._("Cold Storage Class for {0} must be one of: {1}").format(
+					self.storage_provider, ", ".join(allowed)
+				)
+			)
 
 	def _validate_and_encrypt_s3_secret(self):
 		val = (self.s3_aws_secret or "").strip()
@@ -51,10 +71,23 @@ class CloudStorageConfiguration(Document):
 		elif val.startswith("{"):
 			self.gcs_credentials_json = frappe.utils.password.encrypt(val)
 
+	def _validate_and_encrypt_cdn_key(self):
+		val = (self.cdn_private_key or "").strip()
+		if _is_placeholder(val):
+			existing = frappe.db.get_single_value(self.doctype, "cdn_private_key")
+			if existing:
+				self.cdn_private_key = existing
+			elif (self.cdn_private_domain or "").strip():
+				frappe.throw(frappe._("CDN Signing Key is required for the Private CDN Domain"))
+		elif val:
+			self.cdn_private_key = frappe.utils.password.encrypt(val)
+
 	def as_dict(self, *args, **kwargs):
 		d = super().as_dict(*args, **kwargs)
 		if d.get("s3_aws_secret"):
 			d["s3_aws_secret"] = SECRET_PLACEHOLDER
 		if d.get("gcs_credentials_json"):
 			d["gcs_credentials_json"] = SECRET_PLACEHOLDER
+		if d.get("cdn_private_key"):
+			d["cdn_private_key"] = SECRET_PLACEHOLDER
 		return d
@@ -0,0 +1,10 @@
+# Copyright (c) 2026, Bhushan Barbuddhe and contributors
+# For license information, please see license.txt
+
+from multi_cloud_storage.install import backfill_cloud_storage_state, make_custom_fields
+
+
+def execute():
+	# custom fields are otherwise only created after_migrate, which runs after patches
+	make_custom_fields()
+	backfill_cloud_storage_state()
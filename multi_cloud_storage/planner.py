@@ -0,0 +1,271 @@
+# Copyright (c) 2026, Bhushan Barbuddhe and contributors
+# For license information, please see license.txt
+
+import hashlib
+import io
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import frappe
+
+from .backends.ratelimit import BULK, get_rates
+from .controller import MIGRATION_STATES, get_backend, get_config
+
+INVENTORY_TABLE = "mcs_disk_inventory"
+INVENTORY_WORKERS = 8
+INVENTORY_BATCH_SIZE = 1000
+INVENTORY_QUEUE_SIZE = 16
+PROBE_BYTES = 4 * 1024 * 1024
+SAMPLE_SIZE = 10
+PLAN_EVENT = "multi_cloud_storage_migration_plan"
+SIZE_BANDS = (
+	("< 100 KB", 100 * 1024),
+	("100 KB - 1 MB", 1024 * 1024),
+	("1 MB - 10 MB", 10 * 1024 * 1024),
+	("10 MB - 100 MB", 100 * 1024 * 1024),
+	(">= 100 MB", None),
+)
+_DONE = object()
+
+
+def _walk(roots):
+	q = queue.Queue(maxsize=INVENTORY_QUEUE_SIZE)
+	lock = threading.Lock()
+	cancelled = threading.Event()
+	started = [0]
+	pool = ThreadPoolExecutor(max_workers=INVENTORY_WORKERS)
+
+	def put(item):
+		while not cancelled.is_set():
+			try:
+				q.put(item, timeout=1)
+				return
+			except queue.Full:
+				continue
+
+	def submit(path, url_prefix):
+		with lock:
+			started[0] += 1
+		pool.submit(scan, path, url_prefix)
+
+	def scan(path, url_prefix):
+		batch = []
+		try:
+			with os.scandir(path) as it:
+				for entry in it:
+					if entry.is_dir(follow_symlinks=False):
+						submit(entry.path, f"{url_prefix}{entry.name}/")
+					elif entry.is_file(follow_symlinks=False):
+						batch.append((url_prefix + entry.name, entry.stat(follow_symlinks=False).st_size))
+						if len(batch) >= INVENTORY_BATCH_SIZE:
+							put(batch)
+							batch = []
+		except OSError:
+			pass
+		finally:
+			if batch:
+				put(batch)
+			put(_DONE)
+
+	try:
+		for path, url_prefix in roots:
+			if os.path.isdir(path):
+				submit(path, url_prefix)
+		finished = 0
+		while True:
+			with lock:
+				if finished == started[0]:
+					break
+			item = q.get()
+			if item is _DONE:
+				finished += 1
+			else:
+				yield item
+	finally:
+		cancelled.set()
+		pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _load_inventory():
+	frappe.db.sql_ddl(f"DROP TEMPORARY TABLE IF EXISTS {INVENTORY_TABLE}")
+	frappe.db.sql_ddl(
+		f"""CREATE TEMPORARY TABLE {INVENTORY_TABLE} (
+			url_hash CHAR(32) NOT NULL PRIMARY KEY,
+			url TEXT NOT NULL,
+			size BIGINT NOT NULL
+		)"""
+	)
+	roots = [
+		(frappe.get_site_path("public", "files"), "/files/"),
+		(frappe.get_site_path("private", "files"), "/private/files/"),
+	]
+	for batch in _walk(roots):
+		values = []
+		for url, size in batch:
+			values += [hashlib.md5(url.encode()).hexdigest(), url, size]
+		frappe.db.sql(
+			f"INSERT INTO {INVENTORY_TABLE} (url_hash, url, size) VALUES {', '.join(['(%s, %s, %s)'] * len(batch))}",
+			values,
+		)
+		frappe.db.commit()
+
+
+def _size_band_case():
+	whens = " ".join(f"WHEN size < {limit} THEN {i}" for i, (_, limit) in enumerate(SIZE_BANDS) if limit)
+	return f"CASE {whens} ELSE {len(SIZE_BANDS) - 1} END"
+
+
+def _analyse_inventory():
+	states = ", ".join(["%s"] * len(MIGRATION_STATES))
+	to_migrate = f"""url_hash IN (SELECT MD5(file_url) FROM `tabFile`
+		WHERE cloud_storage_state IN ({states}) AND is_folder=0)"""
+	unreferenced = """url_hash NOT IN (SELECT MD5(file_url) FROM `tabFile` WHERE file_url IS NOT NULL
+		UNION SELECT MD5(thumbnail_url) FROM `tabFile` WHERE thumbnail_url IS NOT NULL)"""
+
+	disk = frappe.db.sql(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {INVENTORY_TABLE}")[0]
+	bands = {
+		row[0]: row
+		for row in frappe.db.sql(
+			f"""SELECT {_size_band_case()} AS band, COUNT(*), COALESCE(SUM(size), 0)
+			FROM {INVENTORY_TABLE} WHERE {to_migrate}
+			GROUP BY 1""",
+			MIGRATION_STATES,
+		)
+	}
+	orphans = frappe.db.sql(
+		f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {INVENTORY_TABLE} WHERE {unreferenced}"
+	)[0]
+	orphan_sample = frappe.db.sql(
+		f"SELECT url FROM {INVENTORY_TABLE} WHERE {unreferenced} ORDER BY size DESC LIMIT %s",
+		(SAMPLE_SIZE,),
+		pluck=True,
+	)
+	missing_filter = f"""FROM `tabFile` WHERE cloud_storage_state IN ({states}) AND is_folder=0
+		AND MD5(file_url) NOT IN (SELECT url_hash FROM {INVENTORY_TABLE})"""
+	missing = frappe.db.sql(f"SELECT COUNT(*) {missing_filter}", MIGRATION_STATES)[0][0]
+	missing_sample = frappe.db.sql(
+		f"SELECT name {missing_filter} ORDER BY name LIMIT %s",
+		(*MIGRATION_STATES, SAMPLE_SIZE),
+		pluck=True,
+	)
+
+	size_bands = []
+	for i, (label, _) in enumerate(SIZE_BANDS):
+		row = bands.get(i)
+		size_bands.append({"band": label, "files": row[1] if row else 0, "bytes": int(row[2]) if row else 0})
+	return {
+		"files_on_disk": disk[0],
+		"bytes_on_disk": int(disk[1]),
+		"files_to_migrate": sum(b["files"] for b in size_bands),
+		"bytes_to_migrate": sum(b["bytes"] for b in size_bands),
+		"size_bands": size_bands,
+		"missing_files": missing,
+		"missing_sample": missing_sample,
+		"unreferenced_files": orphans[0],
+		"unreferenced_bytes": int(orphans[1]),
+		"unreferenced_sample": orphan_sample,
+	}
+
+
+def _probe_throughput(backend):
+	prefix = "_multi_cloud_storage_probe"
+	if backend.config.get("folder_name"):
+		prefix = f"{backend.config.folder_name}/{prefix}"
+	small_key = f"{prefix}/{frappe.generate_hash(length=12)}_small"
+	large_key = f"{prefix}/{frappe.generate_hash(length=12)}_large"
+	try:
+		start = time.monotonic()
+		backend.upload_fileobj(io.BytesIO(b"0"), small_key, "application/octet-stream", True)
+		latency = time.monotonic() - start
+		start = time.monotonic()
+		backend.upload_fileobj(
+			io.BytesIO(os.urandom(PROBE_BYTES)), large_key, "application/octet-stream", True
+		)
+		elapsed = time.monotonic() - start
+	finally:
+		for key in (small_key, large_key):
+			try:
+				backend.delete(key, "private", force=True)
+			except Exception:
+				pass
+	throughput = PROBE_BYTES / max(elapsed - latency, 0.001)
+	return latency, throughput
+
+
+def _estimate_seconds(config, files, nbytes, latency, throughput):
+	rates = get_rates(config) if config.get("enable_rate_limit") else {}
+	bandwidth_limit = rates.get((BULK, "bytes"))
+	if bandwidth_limit:
+		throughput = min(throughput, bandwidth_limit)
+	request_time = files * latency
+	request_limit = rates.get((BULK, "requests"))
+	if request_limit:
+		request_time = max(request_time, files / request_limit)
+	return request_time + nbytes / throughput
+
+
+@frappe.whitelist()
+def plan_migration(probe=1):
+	frappe.only_for("System Manager")
+	if not get_config():
+		frappe.throw(frappe._("MultiCloud Storage is not enabled"))
+	frappe.enqueue(
+		"multi_cloud_storage.planner.build_migration_plan",
+		queue="long",
+		timeout=2 * 60 * 60,
+		probe=frappe.utils.cint(probe),
+		user=frappe.session.user,
+	)
+	return {"queued": True}
+
+
+def build_migration_plan(probe, user):
+	try:
+		plan = _build_plan(probe)
+	except Exception:
+		frappe.log_error(title="MultiCloud Storage migration plan failed", message=frappe.get_traceback())
+		frappe.publish_realtime(
+			PLAN_EVENT,
+			{"error": frappe._("The migration plan could not be built. See the Error Log for details.")},
+			user=user,
+		)
+		raise
+	frappe.publish_realtime(PLAN_EVENT, plan, user=user)
+	return plan
+
+
+def _build_plan(probe):
+	config = get_config()
+	if not config:
+		frappe.throw(frappe._("MultiCloud Storage is not enabled"))
+	frappe.flags.cloud_storage_priority = BULK
+	try:
+		_load_inventory()
+		plan = _analyse_inventory()
+	finally:
+		frappe.db.sql_ddl(f"DROP TEMPORARY TABLE IF EXISTS {INVENTORY_TABLE}")
+	backend = get_backend(config)
+	if not probe or not backend or not hasattr(backend, "upload_fileobj"):
+		return plan
+	try:
+		latency, throughput = _probe_throughput(backend)
+	except Exception as e:
+		# the inventory is still useful without an estimate
+		frappe.log_error(title="MultiCloud Storage migration probe failed", message=frappe.get_traceback())
+		plan["probe_error"] = str(e) or e.__class__.__name__
+		return plan
+	plan.update(
+		{
+			"request_latency_seconds": round(latency, 3),
+			"throughput_bytes_per_second": int(throughput),
+			"estimated_seconds": int(
+				_estimate_seconds(
+					config, plan["files_to_migrate"], plan["bytes_to_migrate"], latency, throughput
+				)
+			),
+		}
+	)
+	return plan
@@ -0,0 +1,67 @@
+# Copyright (c) 2026, Bhushan Barbuddhe and Contributors
+# See license.txt
+
+import base64
+import datetime
+import hashlib
+import hmac
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlsplit
+
+import frappe
+from botocore.signers import CloudFrontSigner
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from frappe.tests import UnitTestCase
+
+from multi_cloud_storage.backends import cdn
+
+CDN_KEY = base64.urlsafe_b64encode(b"0123456789abcdef").decode()
+
+
+class TestCloudCDNSignedURL(UnitTestCase):
+	def sign(self, url):
+		config = frappe._dict(cdn_key_pair_id="mcs-key")
+		with (
+			patch.object(cdn, "_get_signing_key", return_value=CDN_KEY),
+			patch.object(cdn.time, "time", return_value=1000),
+		):
+			return cdn.cloud_cdn_signed_url(config, url, 300)
+
+	def test_format(self):
+		url = self.sign("https://cdn.example.com/a/b.pdf")
+		unsigned, signature = url.split("&Signature=")
+		self.assertEqual(unsigned, "https://cdn.example.com/a/b.pdf?Expires=1300&KeyName=mcs-key")
+		digest = hmac.new(base64.urlsafe_b64decode(CDN_KEY), unsigned.encode(), hashlib.sha1).digest()
+		self.assertEqual(signature, base64.urlsafe_b64encode(digest).decode())
+
+	def test_existing_query_string(self):
+		url = self.sign("https://cdn.example.com/a.pdf?v=1")
+		self.assertTrue(url.startswith("https://cdn.example.com/a.pdf?v=1&Expires=1300&KeyName=mcs-key&"))
+
+
+class TestCloudFrontSignedURL(UnitTestCase):
+	def test_canned_policy_signature(self):
+		private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+		pem = private_key.private_bytes(
+			serialization.Encoding.PEM,
+			serialization.PrivateFormat.PKCS8,
+			serialization.NoEncryption(),
+		).decode()
+		config = frappe._dict(cdn_key_pair_id="K2JCJMDEHXQW5F")
+		resource = "https://d1234.cloudfront.net/a/b.pdf"
+		with patch.object(cdn, "_get_signing_key", return_value=pem):
+			url = cdn.cloudfront_signed_url(config, resource, 300)
+
+		parts = urlsplit(url)
+		self.assertEqual(f"{parts.scheme}://{parts.netloc}{parts.path}", resource)
+		query = parse_qs(parts.query)
+		self.assertEqual(query["Key-Pair-Id"], ["K2JCJMDEHXQW5F"])
+		expires = int(query["Expires"][0])
+		policy = CloudFrontSigner("K2JCJMDEHXQW5F", None).build_policy(
+			resource, datetime.datetime.fromtimestamp(expires, datetime.UTC)
+		)
+		signature = query["Signature"][0].replace("-", "+").replace("_", "=").replace("~", "/")
+		private_key.public_key().verify(
+			base64.b64decode(signature), policy.encode(), padding.PKCS1v15(), hashes.SHA1()
+		)
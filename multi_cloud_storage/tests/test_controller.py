@@ -0,0 +1,167 @@
+# Copyright (c) 2026, Bhushan Barbuddhe and Contributors
+# See license.txt
+
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests import UnitTestCase
+
+from multi_cloud_storage import controller
+
+
+class TestGenerateFile(UnitTestCase):
+	def generate(self, derivative_key, **kwargs):
+		backend = MagicMock()
+		backend.get_url.side_effect = lambda key, file_name, bucket_type: f"https://signed/{key}"
+		response = {}
+		with (
+			patch.object(controller, "get_backend", return_value=backend),
+			patch.object(controller, "_get_derivative_key", return_value=derivative_key),
+			patch.object(controller, "record_access") as record_access,
+			patch.object(frappe.local, "response", response, create=True),
+		):
+			controller.generate_file(key="private:a/b.png", file_name="b.png", **kwargs)
+		return response, record_access
+
+	def test_original_is_counted(self):
+		response, record_access = self.generate(None)
+
+		self.assertEqual(response["location"], "https://signed/a/b.png")
+		record_access.assert_called_once_with("private:a/b.png")
+
+	def test_derivative_is_not_counted(self):
+		response, record_access = self.generate("a/b.png.thumbnail.webp", size="thumbnail")
+
+		self.assertEqual(response["location"], "https://signed/a/b.png.thumbnail.webp")
+		record_access.assert_not_called()
+
+	def test_fallback_to_original_is_counted(self):
+		response, record_access = self.generate("a/b.png", size="thumbnail")
+
+		self.assertEqual(response["location"], "https://signed/a/b.png")
+		record_access.assert_called_once_with("private:a/b.png")
+
+
+class _FileTable:
+	def __init__(self, **rows):
+		self.rows = {name: frappe._dict(name=name, **row) for name, row in rows.items()}
+		self.pages = []
+
+	def sql(self, query, values, pluck=False):
+		*states, last_name, limit = values
+		names = sorted(n for n, row in self.rows.items() if row.state in states and n > last_name)[:limit]
+		self.pages.append(names)
+		return names
+
+	def count(self, doctype, filters):
+		if "cloud_storage_state" in filters:
+			return sum(row.state == filters["cloud_storage_state"] for row in self.rows.values())
+		return len(self.rows)
+
+	def set_state(self, names, state, provider=None):
+		for name in [names] if isinstance(names, str) else names:
+			self.rows[name].state = state
+
+	def upload(self, doc, derivatives):
+		if doc.disk == "error":
+			raise Exception("upload failed")
+		if doc.disk == "missing":
+			return "file_not_found"
+		if doc.disk == "present":
+			doc.state = controller.STATE_CLOUD
+			return True
+		return False
+
+
+class TestMigrateExistingFiles(UnitTestCase):
+	def migrate(self, table):
+		db = MagicMock()
+		db.sql.side_effect = table.sql
+		db.count.side_effect = table.count
+		db.get_single_value.return_value = None
+		with (
+			patch.object(controller, "get_config", return_value=frappe._dict(storage_provider="Amazon S3")),
+			patch.object(controller, "MIGRATION_BATCH_SIZE", 2),
+			patch.object(controller, "_set_storage_state", side_effect=table.set_state),
+			patch.object(controller, "_upload_existing_file", side_effect=table.upload),
+			patch.object(frappe, "db", db, create=True),
+			patch.object(frappe, "get_doc", create=True, side_effect=lambda doctype, name: table.rows[name]),
+			patch.object(frappe, "enqueue", create=True),
+			patch.object(frappe, "log_error", create=True),
+			patch.object(frappe, "get_traceback", create=True, return_value=""),
+			patch.dict(frappe.flags),
+		):
+			return controller.migrate_existing_files()
+
+	def test_pages_through_every_candidate_once(self):
+		table = _FileTable(
+			**{f"F{i}": {"state": controller.STATE_LOCAL, "disk": "present"} for i in range(5)},
+			C1={"state": controller.STATE_CLOUD},
+		)
+		result = self.migrate(table)
+
+		self.assertEqual(result["migrated"], 5)
+		self.assertEqual(table.pages, [["F0", "F1"], ["F2", "F3"], ["F4"], []])
+		self.assertTrue(all(row.state == controller.STATE_CLOUD for row in table.rows.values()))
+
+	def test_state_transitions(self):
+		table = _FileTable(
+			F1={"state": controller.STATE_LOCAL, "disk": "present"},
+			F2={"state": controller.STATE_FAILED, "disk": "missing"},
+			F3={"state": controller.STATE_PENDING, "disk": "error"},
+			F4={
+				"state": controller.STATE_FAILED,
+				"file_url": "/api/method/multi_cloud_storage.controller.generate_file?key=private%3Aa/b.pdf",
+				"content_hash": "private:a/b.pdf",
+			},
+			F5={"state": controller.STATE_LOCAL, "file_url": "https://example.com/b.pdf"},
+			M1={"state": controller.STATE_MISSING},
+		)
+		result = self.migrate(table)
+
+		self.assertEqual(
+			{name: row.state for name, row in table.rows.items()},
+			{
+				"F1": controller.STATE_CLOUD,
+				"F2": controller.STATE_FAILED,
+				"F3": controller.STATE_FAILED,
+				"F4": controller.STATE_CLOUD,
+				"F5": controller.STATE_MISSING,
+				"M1": controller.STATE_MISSING,
+			},
+		)
+		self.assertEqual(result["migrated"], 1)
+		self.assertEqual(result["skipped_file_not_found"], 1)
+		self.assertEqual(result["skipped_other"], 1)
+		self.assertEqual(result["errors"], [{"file": "F3", "error": "upload failed"}])
+
+	def test_failed_rows_are_not_retried_in_the_same_run(self):
+		table = _FileTable(
+			F1={"state": controller.STATE_LOCAL, "disk": "missing"},
+			F2={"state": controller.STATE_LOCAL, "disk": "missing"},
+			F3={"state": controller.STATE_LOCAL, "disk": "present"},
+		)
+		result = self.migrate(table)
+
+		self.assertEqual(table.pages, [["F1", "F2"], ["F3"], []])
+		self.assertEqual(result["skipped_file_not_found"], 2)
+
+
+class TestDeleteFromCloud(UnitTestCase):
+	def test_shared_rows_become_missing(self):
+		backend = MagicMock()
+		backend.config = frappe._dict(delete_file_from_cloud=1)
+		doc = frappe._dict(name="F1", content_hash="private:a/b.png", cloud_derivatives="thumbnail.webp")
+		with (
+			patch.object(controller, "get_backend", return_value=backend),
+			patch.object(controller, "_set_storage_state") as set_state,
+			patch.object(frappe, "get_all", create=True, return_value=["F2"]) as get_all,
+		):
+			controller.delete_from_cloud(doc)
+
+		self.assertEqual(
+			backend.delete.call_args_list,
+			[(("a/b.png", "private"),), (("a/b.png.thumbnail.webp", "private"),)],
+		)
+		self.assertEqual(get_all.call_args.kwargs["filters"]["content_hash"], "private:a/b.png")
+		set_state.assert_called_once_with(["F2"], controller.STATE_MISSING)
@@ -0,0 +1,61 @@
+# Copyright (c) 2026, Bhushan Barbuddhe and Contributors
+# See license.txt
+
+import io
+import zipfile
+
+import frappe
+from frappe.tests import UnitTestCase
+
+from multi_cloud_storage.export import _iter_zip, _unique_arcname
+
+
+def _reader(objects, chunk_size=3):
+	def read(key):
+		data = objects[key]
+		if isinstance(data, Exception):
+			raise data
+		for i in range(0, len(data), chunk_size):
+			yield data[i : i + chunk_size]
+
+	return read
+
+
+class TestUniqueArcname(UnitTestCase):
+	def test_duplicates_are_numbered(self):
+		seen = set()
+		self.assertEqual(_unique_arcname("INV-1/a.pdf", seen), "INV-1/a.pdf")
+		self.assertEqual(_unique_arcname("INV-1/a.pdf", seen), "INV-1/a (1).pdf")
+		self.assertEqual(_unique_arcname("INV-1/a.pdf", seen), "INV-1/a (2).pdf")
+		self.assertEqual(_unique_arcname("INV-2/a.pdf", seen), "INV-2/a.pdf")
+
+	def test_leading_slash_and_backslash(self):
+		self.assertEqual(_unique_arcname("/INV-1/a\\b.pdf", set()), "INV-1/a_b.pdf")
+
+
+class TestIterZip(UnitTestCase):
+	def build(self, objects, items):
+		readers = {"private": _reader(objects), "public": _reader(objects)}
+		return zipfile.ZipFile(io.BytesIO(b"".join(_iter_zip(readers, items))))
+
+	def test_round_trip(self):
+		objects = {f"k{i}": f"content of file {i}".encode() * (i + 1) for i in range(10)}
+		items = [
+			frappe._dict(key=key, bucket_type="private" if i % 2 else "public", arcname=f"DOC/{key}.txt")
+			for i, key in enumerate(objects)
+		]
+		with self.build(objects, items) as zf:
+			self.assertEqual(zf.namelist(), [item.arcname for item in items])
+			for item in items:
+				self.assertEqual(zf.read(item.arcname), objects[item.key])
+
+	def test_fetch_errors_are_listed(self):
+		objects = {"ok": b"fine", "missing": FileNotFoundError("no such key")}
+		items = [
+			frappe._dict(key="missing", bucket_type="private", arcname="DOC/missing.txt"),
+			frappe._dict(key="ok", bucket_type="private", arcname="DOC/ok.txt"),
+		]
+		with self.build(objects, items) as zf:
+			self.assertEqual(zf.namelist(), ["DOC/ok.txt", "_errors.txt"])
+			self.assertEqual(zf.read("DOC/ok.txt"), b"fine")
+			self.assertIn("DOC/missing.txt: no such key", zf.read("_errors.txt").decode())
@@ -0,0 +1,115 @@
+# Copyright (c) 2026, Bhushan Barbuddhe and Contributors
+# See license.txt
+
+import base64
+import hashlib
+import io
+import json
+import tempfile
+import zipfile
+from unittest.mock import patch
+
+import frappe
+import google_crc32c
+from frappe.tests import UnitTestCase
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import storage
+from requests.structures import CaseInsensitiveDict
+
+from multi_cloud_storage.backends import gcs_backend
+from multi_cloud_storage.backends.gcs_backend import GCSBackend
+from multi_cloud_storage.backends.ratelimit import RateLimiter
+from multi_cloud_storage.export import _iter_zip, _IterReader
+
+
+class _Response:
+	def __init__(self, status_code, headers=None, body=None):
+		self.status_code = status_code
+		self.headers = CaseInsensitiveDict(headers or {})
+		self.content = json.dumps(body).encode() if body else b""
+
+	def json(self):
+		return json.loads(self.content)
+
+
+class _ResumableUploadSession:
+	# answers the resumable upload protocol in memory
+
+	is_mtls = False
+
+	def __init__(self):
+		self.data = bytearray()
+		self.puts = 0
+
+	def request(self, method, url, data=None, headers=None, **kwargs):
+		if method == "POST":
+			return _Response(200, {"location": "https://upload.example.com/session"})
+		self.puts += 1
+		self.data += data.read() if hasattr(data, "read") else data or b""
+		if headers["content-range"].endswith("/*"):
+			return _Response(308, {"range": f"bytes=0-{len(self.data) - 1}"})
+		return _Response(
+			200,
+			body={
+				"name": "key",
+				"bucket": "bucket",
+				"size": str(len(self.data)),
+				"crc32c": base64.b64encode(google_crc32c.Checksum(bytes(self.data)).digest()).decode(),
+				"md5Hash": base64.b64encode(hashlib.md5(self.data).digest()).decode(),
+			},
+		)
+
+
+class TestGCSUploadFileobj(UnitTestCase):
+	def setUp(self):
+		self.session = _ResumableUploadSession()
+		client = storage.Client(project="test", credentials=AnonymousCredentials(), _http=self.session)
+		self.backend = GCSBackend(frappe._dict())
+		self.backend._client = client
+		patcher = patch.object(self.backend, "_bucket", return_value=client.bucket("bucket"))
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def test_non_seekable_zip_stream(self):
+		objects = {f"k{i}": bytes([i]) * 200 * 1024 for i in range(4)}
+		items = [frappe._dict(key=key, bucket_type="private", arcname=f"{key}.bin") for key in objects]
+
+		def read(key):
+			yield objects[key]
+
+		stream = io.BufferedReader(_IterReader(_iter_zip({"private": read}, items)))
+		with patch.object(gcs_backend, "UPLOAD_CHUNK_SIZE", 256 * 1024):
+			self.backend.upload_fileobj(stream, "exports/a.zip", "application/zip", True)
+
+		self.assertGreater(self.session.puts, 1)
+		with zipfile.ZipFile(io.BytesIO(bytes(self.session.data))) as zf:
+			for item in items:
+				self.assertEqual(zf.read(item.arcname), objects[item.key])
+
+	def set_recording_limiter(self):
+		calls = []
+		self.backend.limiter = RateLimiter.__new__(RateLimiter)
+		self.backend.limiter.acquire = lambda requests=1, nbytes=0: calls.append((requests, nbytes))
+		return calls
+
+	def test_rate_limited_upload(self):
+		calls = self.set_recording_limiter()
+		data = b"z" * 300 * 1024
+		with patch.object(gcs_backend, "UPLOAD_CHUNK_SIZE", 256 * 1024):
+			self.backend.upload_fileobj(io.BytesIO(data), "thumbs/a.webp", "image/webp", True)
+
+		self.assertEqual(bytes(self.session.data), data)
+		self.assertEqual(sum(requests for requests, _ in calls), 1)
+		self.assertEqual(sum(nbytes for _, nbytes in calls), len(data))
+
+	def test_rate_limited_file_upload(self):
+		calls = self.set_recording_limiter()
+		data = b"f" * 300 * 1024
+		with tempfile.NamedTemporaryFile() as f:
+			f.write(data)
+			f.flush()
+			with patch.object(gcs_backend, "UPLOAD_CHUNK_SIZE", 256 * 1024):
+				self.backend.upload(f.name, "files/a.bin", "application/octet-stream", True)
+
+		self.assertEqual(bytes(self.session.data), data)
+		self.assertEqual(sum(nbytes for _, nbytes in calls), len(data))
@@ -0,0 +1,188 @@
+# Copyright (c) 2026, Bhushan Barbuddhe and Contributors
+# See license.txt
+
+import base64
+import io
+import json
+import threading
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests import UnitTestCase
+from werkzeug.datastructures import FileStorage, MultiDict
+
+from multi_cloud_storage import ingest
+
+
+class _Backend:
+	def __init__(self, fail=()):
+		self.fail = set(fail)
+		self.config = frappe._dict(storage_provider="Amazon S3")
+		self.uploaded = {}
+		self.deleted = []
+		self.lock = threading.Lock()
+
+	def key_generator(self, file_name, parent_doctype, parent_name):
+		return f"{parent_doctype}/{parent_name}/{file_name}"
+
+	def get_public_url(self, key):
+		return f"https://bucket/{key}"
+
+	def get_uploader(self, is_private):
+		def upload(fileobj, key, content_type, file_name=None, size=0):
+			if file_name in self.fail:
+				raise Exception("SlowDown")
+			with self.lock:
+				self.uploaded[key] = (fileobj.read(), is_private)
+			return key
+
+		return upload
+
+	def delete(self, key, bucket_type="private", force=False):
+		self.deleted.append((key, bucket_type, force))
+
+
+class _File:
+	def __init__(self, doc):
+		self.file_name = doc["file_name"]
+		self.file_type = None
+
+	def set_file_type(self):
+		self.file_type = self.file_name.rsplit(".", 1)[-1].upper()
+
+	def validate_file_extension(self):
+		if self.file_type == "EXE":
+			raise frappe.ValidationError(f"File type of {self.file_name} is not allowed")
+
+
+def _b64(file_name, content, **kwargs):
+	return {"file_name": file_name, "content": base64.b64encode(content).decode(), **kwargs}
+
+
+class TestBulkIngest(UnitTestCase):
+	def ingest(
+		self, backend, files=None, request_files=None, max_attachments=0, attached=0, insert_error=None
+	):
+		db = MagicMock()
+		db.count.return_value = attached
+		db.bulk_insert.side_effect = insert_error
+		self.db = db
+		request = frappe._dict(files=MultiDict(request_files or []))
+		names = iter(f"FILE{i:03}" for i in range(100))
+		with (
+			patch.object(ingest, "get_backend", return_value=backend),
+			patch.object(ingest, "_enqueue_derivatives") as self.enqueue,
+			patch.object(frappe, "request", request),
+			patch.object(frappe, "db", db, create=True),
+			patch.object(frappe, "session", frappe._dict(user="test@example.com"), create=True),
+			patch.object(frappe, "has_permission", create=True),
+			patch.object(frappe, "get_cached_doc", create=True),
+			patch.object(frappe, "get_doc", create=True, side_effect=_File),
+			patch.object(frappe, "clear_last_message", create=True),
+			patch.object(
+				frappe, "get_meta", create=True, return_value=frappe._dict(max_attachments=max_attachments)
+			),
+			patch.object(frappe, "parse_json", create=True, side_effect=lambda v: json.loads(v) if v else v),
+			patch.object(frappe, "generate_hash", create=True, side_effect=lambda length: next(names)),
+			patch.object(frappe.utils, "now", create=True, return_value="2026-10-18 12:00:00"),
+		):
+			return ingest.bulk_ingest("ToDo", "TD-1", files=json.dumps(files) if files else None)
+
+	def inserted(self):
+		if not self.db.bulk_insert.called:
+			return []
+		doctype, fields, rows = self.db.bulk_insert.call_args.args
+		self.assertEqual((doctype, fields), ("File", ingest.FILE_FIELDS))
+		return [dict(zip(fields, row, strict=True)) for row in rows]
+
+	def test_multipart_and_base64_are_read(self):
+		backend = _Backend()
+		result = self.ingest(
+			backend,
+			files=[_b64("b.txt", b"base64 body", is_private=0)],
+			request_files=[("file", FileStorage(io.BytesIO(b"multipart body"), filename="a.txt"))],
+		)
+
+		self.assertEqual((result["uploaded"], result["failed"]), (2, 0))
+		self.assertEqual(
+			backend.uploaded,
+			{"ToDo/TD-1/a.txt": (b"multipart body", 1), "ToDo/TD-1/b.txt": (b"base64 body", 0)},
+		)
+		rows = {row["file_name"]: row for row in self.inserted()}
+		self.assertEqual(rows["a.txt"]["content_hash"], "private:ToDo/TD-1/a.txt")
+		self.assertTrue(rows["a.txt"]["file_url"].startswith("/api/method/"))
+		self.assertEqual(rows["b.txt"]["file_url"], "https://bucket/ToDo/TD-1/b.txt")
+		self.assertEqual(rows["b.txt"]["file_size"], len(b"base64 body"))
+		self.assertEqual(rows["b.txt"]["file_type"], "TXT")
+		self.assertEqual({row["attached_to_name"] for row in rows.values()}, {"TD-1"})
+		self.assertEqual(self.enqueue.call_count, 2)
+
+	def test_invalid_base64_is_reported(self):
+		backend = _Backend()
+		result = self.ingest(
+			backend,
+			files=[{"file_name": "bad.txt", "content": "not base64!"}, _b64("ok.txt", b"ok")],
+		)
+
+		self.assertEqual((result["uploaded"], result["failed"]), (1, 1))
+		self.assertEqual(
+			result["files"][0], {"file_name": "bad.txt", "success": False, "error": "Invalid base64 content"}
+		)
+		self.assertEqual(sorted(backend.uploaded), ["ToDo/TD-1/ok.txt"])
+
+	def test_one_failure_does_not_stop_the_batch(self):
+		backend = _Backend(fail={"b.txt"})
+		result = self.ingest(
+			backend,
+			files=[_b64("a.txt", b"a"), _b64("b.txt", b"b"), _b64("c.exe", b"c"), _b64("d.txt", b"d")],
+		)
+
+		self.assertEqual((result["uploaded"], result["failed"]), (2, 2))
+		self.assertEqual(
+			[(f["file_name"], f["success"]) for f in result["files"]],
+			[("a.txt", True), ("b.txt", False), ("c.exe", False), ("d.txt", True)],
+		)
+		self.assertEqual(result["files"][1]["error"], "SlowDown")
+		self.assertIn("not allowed", result["files"][2]["error"])
+		self.assertEqual([row["file_name"] for row in self.inserted()], ["a.txt", "d.txt"])
+		self.assertEqual(backend.deleted, [])
+
+	def test_attachment_limit_counts_down_across_the_batch(self):
+		backend = _Backend()
+		result = self.ingest(
+			backend,
+			files=[
+				_b64("a.txt", b"a"),
+				{"file_name": "bad.txt", "content": "not base64!"},
+				_b64("b.exe", b"b"),
+				_b64("c.txt", b"c"),
+				_b64("d.txt", b"d"),
+			],
+			max_attachments=3,
+			attached=1,
+		)
+
+		self.assertEqual(
+			[(f["file_name"], f["success"]) for f in result["files"]],
+			[("a.txt", True), ("bad.txt", False), ("b.exe", False), ("c.txt", True), ("d.txt", False)],
+		)
+		self.assertIn("Maximum Attachment Limit of 3", result["files"][4]["error"])
+		self.assertEqual(sorted(backend.uploaded), ["ToDo/TD-1/a.txt", "ToDo/TD-1/c.txt"])
+		self.db.count.assert_called_once_with(
+			"File", {"attached_to_doctype": "ToDo", "attached_to_name": "TD-1"}
+		)
+
+	def test_insert_failure_deletes_uploaded_objects(self):
+		backend = _Backend(fail={"b.txt"})
+		with self.assertRaisesRegex(Exception, "Deadlock"):
+			self.ingest(
+				backend,
+				files=[_b64("a.txt", b"a"), _b64("b.txt", b"b"), _b64("c.txt", b"c", is_private=0)],
+				insert_error=Exception("Deadlock"),
+			)
+
+		self.assertEqual(
+			sorted(backend.deleted),
+			[("ToDo/TD-1/a.txt", "private", True), ("ToDo/TD-1/c.txt", "public", True)],
+		)
+		self.enqueue.assert_not_called()
@@ -0,0 +1,86 @@
+# Copyright (c) 2026, Bhushan Barbuddhe and Contributors
+# See license.txt
+
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests import UnitTestCase
+
+from multi_cloud_storage import planner
+from multi_cloud_storage.planner import SIZE_BANDS, _estimate_seconds, _size_band_case
+
+MB = 1024 * 1024
+
+
+class TestSizeBands(UnitTestCase):
+	def test_size_band_case(self):
+		self.assertEqual(
+			_size_band_case(),
+			"CASE WHEN size < 102400 THEN 0 WHEN size < 1048576 THEN 1 "
+			"WHEN size < 10485760 THEN 2 WHEN size < 104857600 THEN 3 ELSE 4 END",
+		)
+		self.assertEqual(len(SIZE_BANDS), 5)
+
+
+class TestEstimateSeconds(UnitTestCase):
+	def test_without_rate_limit(self):
+		config = frappe._dict(bulk_requests_per_second=1, bulk_bandwidth=1)
+		self.assertAlmostEqual(_estimate_seconds(config, 100, 200 * MB, 0.05, 10 * MB), 5 + 20)
+
+	def test_bandwidth_limit(self):
+		config = frappe._dict(enable_rate_limit=1, bulk_bandwidth=2)
+		self.assertAlmostEqual(_estimate_seconds(config, 100, 200 * MB, 0.05, 10 * MB), 5 + 100)
+
+	def test_request_limit(self):
+		config = frappe._dict(enable_rate_limit=1, bulk_requests_per_second=10)
+		self.assertAlmostEqual(_estimate_seconds(config, 1000, 0, 0.001, 10 * MB), 100)
+
+
+class TestBuildMigrationPlan(UnitTestCase):
+	def build(self, probe_error=None, analyse_error=None):
+		backend = MagicMock()
+		with (
+			patch.object(planner, "get_config", return_value=frappe._dict(storage_provider="Amazon S3")),
+			patch.object(planner, "get_backend", return_value=backend),
+			patch.object(planner, "_load_inventory"),
+			patch.object(
+				planner,
+				"_analyse_inventory",
+				side_effect=analyse_error,
+				return_value={"files_to_migrate": 10, "bytes_to_migrate": 10 * MB},
+			),
+			patch.object(planner, "_probe_throughput", side_effect=probe_error, return_value=(0.01, 10 * MB)),
+			patch.object(frappe, "db", MagicMock(), create=True),
+			patch.object(frappe, "log_error", create=True) as log_error,
+			patch.object(frappe, "get_traceback", create=True, return_value=""),
+			patch.object(frappe, "publish_realtime", create=True) as publish,
+			patch.dict(frappe.flags),
+		):
+			try:
+				planner.build_migration_plan(1, "user@example.com")
+			except RuntimeError:
+				pass
+		self.assertEqual(publish.call_count, 1)
+		self.assertEqual(publish.call_args.args[0], planner.PLAN_EVENT)
+		self.assertEqual(publish.call_args.kwargs["user"], "user@example.com")
+		return publish.call_args.args[1], log_error
+
+	def test_plan_with_estimate(self):
+		plan, log_error = self.build()
+
+		self.assertEqual(plan["estimated_seconds"], 1)
+		log_error.assert_not_called()
+
+	def test_probe_failure_still_publishes_inventory(self):
+		plan, log_error = self.build(probe_error=ConnectionError("endpoint unreachable"))
+
+		self.assertEqual(plan["files_to_migrate"], 10)
+		self.assertEqual(plan["probe_error"], "endpoint unreachable")
+		self.assertNotIn("estimated_seconds", plan)
+		log_error.assert_called_once()
+
+	def test_failure_publishes_error(self):
+		plan, log_error = self.build(analyse_error=RuntimeError("lost connection"))
+
+		self.assertIn("error", plan)
+		log_error.assert_called_once()
@@ -0,0 +1,124 @@
+# Copyright (c) 2026, Bhushan Barbuddhe and Contributors
+# See license.txt
+
+import io
+import tempfile
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests import UnitTestCase
+
+from multi_cloud_storage.backends import ratelimit
+from multi_cloud_storage.backends.ratelimit import (
+	BULK,
+	INTERACTIVE,
+	RateLimiter,
+	ThrottledReader,
+	get_limiter,
+	get_priority,
+	get_rates,
+)
+from multi_cloud_storage.backends.s3_backend import S3Backend
+from multi_cloud_storage.export import _IterReader
+
+
+class _RecordingLimiter:
+	def __init__(self):
+		self.calls = []
+
+	def acquire(self, requests=1, nbytes=0):
+		self.calls.append((requests, nbytes))
+
+	def wrap_reader(self, fileobj):
+		return ThrottledReader(fileobj, self)
+
+
+class TestRates(UnitTestCase):
+	def test_get_rates(self):
+		config = frappe._dict(
+			interactive_requests_per_second=50, interactive_bandwidth=8, bulk_requests_per_second=5
+		)
+		self.assertEqual(
+			get_rates(config),
+			{
+				(INTERACTIVE, "requests"): 50,
+				(INTERACTIVE, "bytes"): 8 * 1024 * 1024,
+				(BULK, "requests"): 5,
+				(BULK, "bytes"): 0,
+			},
+		)
+
+	def test_disabled(self):
+		self.assertIsNone(get_limiter(frappe._dict(interactive_requests_per_second=50)))
+
+	def test_priority_flag(self):
+		frappe.flags.cloud_storage_priority = BULK
+		try:
+			self.assertEqual(get_priority(), BULK)
+		finally:
+			frappe.flags.cloud_storage_priority = None
+
+
+class TestThrottledReader(UnitTestCase):
+	def test_acquires_bytes_read(self):
+		limiter = _RecordingLimiter()
+		reader = io.BufferedReader(ThrottledReader(io.BytesIO(b"x" * 10), limiter), buffer_size=4)
+		self.assertEqual(reader.read(), b"x" * 10)
+		self.assertEqual(sum(n for _, n in limiter.calls), 10)
+		self.assertTrue(all(requests == 0 for requests, _ in limiter.calls))
+
+	def test_seek_and_tell_pass_through(self):
+		limiter = _RecordingLimiter()
+		reader = ThrottledReader(io.BytesIO(b"0123456789"), limiter)
+		self.assertTrue(reader.seekable())
+		self.assertEqual(reader.read(4), b"0123")
+		self.assertEqual(reader.tell(), 4)
+		reader.seek(0)
+		self.assertEqual(reader.read(), b"0123456789")
+		self.assertFalse(ThrottledReader(_IterReader([b"x"]), limiter).seekable())
+
+
+class TestAcquire(UnitTestCase):
+	def make_limiter(self, calls):
+		def take(keys, args):
+			calls.append(args)
+			return "0" if args[3] == 1 else "5"
+
+		limiter = RateLimiter.__new__(RateLimiter)
+		limiter.priority = BULK
+		limiter.rates = get_rates(frappe._dict(bulk_requests_per_second=1, bulk_bandwidth=1))
+		limiter.keys = {(p, d): f"{p}:{d}" for p in (INTERACTIVE, BULK) for d in ("requests", "bytes")}
+		limiter._take = take
+		return limiter
+
+	def test_tokens_are_taken_after_deadline(self):
+		calls = []
+		limiter = self.make_limiter(calls)
+		clock = [0.0]
+		with (
+			patch.object(ratelimit.time, "monotonic", side_effect=lambda: clock[0]),
+			patch.object(ratelimit.time, "sleep", side_effect=lambda s: clock.__setitem__(0, clock[0] + s)),
+			patch.object(frappe, "logger", create=True),
+		):
+			limiter.acquire(1, 4096)
+
+		forced = [args for args in calls if args[3] == 1]
+		self.assertEqual([args[2] for args in forced], [1, 4096])
+		self.assertGreaterEqual(clock[0], ratelimit.MAX_WAIT[BULK])
+
+
+class TestS3FileUpload(UnitTestCase):
+	def test_file_upload_is_read_through_limiter(self):
+		backend = S3Backend(frappe._dict(s3_private_bucket_name="bucket"))
+		backend.limiter = _RecordingLimiter()
+		received = []
+		backend._client = MagicMock()
+		backend._client.upload_fileobj.side_effect = lambda f, *a, **k: received.append(f.read())
+		with tempfile.NamedTemporaryFile() as f:
+			f.write(b"a" * 100_000)
+			f.flush()
+			backend.upload(f.name, "k", "text/plain", True, "a.txt")
+
+		backend._client.upload_file.assert_not_called()
+		self.assertEqual(received, [b"a" * 100_000])
+		self.assertEqual(sum(n for _, n in backend.limiter.calls), 100_000)
@@ -0,0 +1,94 @@
+# Copyright (c) 2026, Bhushan Barbuddhe and Contributors
+# See license.txt
+
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests import UnitTestCase
+
+from multi_cloud_storage import tiering
+
+
+class _Backend:
+	def __init__(self, errors=None):
+		self.errors = errors or {}
+		self.calls = []
+
+	def set_storage_class(self, keys, storage_class, bucket_type):
+		self.calls.append((keys, storage_class, bucket_type))
+		return [(key, *self.errors.get(key, (None, False))) for key in keys]
+
+
+def _files(*names):
+	return [frappe._dict(name=name, content_hash=f"private:a/{name}.pdf") for name in names]
+
+
+class TestMoveBatch(UnitTestCase):
+	def move(self, backend, files):
+		with (
+			patch.object(tiering, "_mark_files") as mark_files,
+			patch.object(frappe, "log_error", create=True) as log_error,
+		):
+			result = tiering._move_batch(backend, files, "GLACIER_IR")
+		return result, mark_files, log_error
+
+	def test_object_errors_are_flagged(self):
+		backend = _Backend({"a/F2.pdf": ("NoSuchKey", True), "a/F3.pdf": ("SlowDown", False)})
+		result, mark_files, log_error = self.move(backend, _files("F1", "F2", "F3"))
+
+		self.assertEqual(result, (1, 1, 1))
+		self.assertEqual(backend.calls, [(["a/F1.pdf", "a/F2.pdf", "a/F3.pdf"], "GLACIER_IR", "private")])
+		mark_files.assert_any_call(["F1"], "cloud_storage_class", "GLACIER_IR")
+		mark_files.assert_any_call(["F2"], "cloud_tiering_failed", 1)
+		message = log_error.call_args.kwargs["message"]
+		self.assertIn("a/F2.pdf: NoSuchKey", message)
+		self.assertIn("a/F3.pdf: SlowDown", message)
+
+	def test_config_errors_are_not_flagged(self):
+		backend = _Backend({"a/F1.pdf": ("InvalidStorageClass", False)})
+		result, mark_files, _ = self.move(backend, _files("F1"))
+
+		self.assertEqual(result, (0, 0, 1))
+		mark_files.assert_any_call([], "cloud_tiering_failed", 1)
+
+
+class TestMoveColdFiles(UnitTestCase):
+	def run_job(self, config, backend, pages):
+		db = MagicMock()
+		db.sql.side_effect = [*pages, []]
+		with (
+			patch.object(tiering, "get_config", return_value=config),
+			patch.object(tiering, "get_backend", return_value=backend),
+			patch.object(tiering, "_mark_files"),
+			patch.object(frappe, "db", db, create=True),
+			patch.object(frappe, "log_error", create=True),
+			patch.object(frappe, "utils", MagicMock(), create=True),
+		):
+			return tiering.move_cold_files(), db
+
+	def config(self, storage_class):
+		return frappe._dict(
+			enable_storage_tiering=1, storage_provider="Amazon S3", cold_storage_class=storage_class
+		)
+
+	def test_pages_until_no_candidates(self):
+		backend = _Backend()
+		result, db = self.run_job(self.config("GLACIER_IR"), backend, [_files("F1", "F2"), _files("F3")])
+
+		self.assertEqual(result, {"moved": 3, "failed": 0, "errors": 0})
+		self.assertEqual(db.sql.call_count, 3)
+		self.assertEqual(db.sql.call_args.args[1][4], "F3")
+
+	def test_stops_when_a_whole_batch_fails_outside_the_objects(self):
+		backend = _Backend({f"a/F{i}.pdf": ("AccessDenied", False) for i in (1, 2)})
+		result, db = self.run_job(self.config("GLACIER_IR"), backend, [_files("F1", "F2"), _files("F3")])
+
+		self.assertEqual(result, {"moved": 0, "failed": 0, "errors": 2})
+		self.assertEqual(db.sql.call_count, 1)
+
+	def test_restore_only_classes_are_ignored(self):
+		backend = _Backend()
+		result, _ = self.run_job(self.config("DEEP_ARCHIVE"), backend, [_files("F1")])
+
+		self.assertIsNone(result)
+		self.assertEqual(backend.calls, [])
@@ -0,0 +1,166 @@
+# Copyright (c) 2026, Bhushan Barbuddhe and contributors
+# For license information, please see license.txt
+
+import time
+
+import frappe
+
+from .controller import (
+	ACCESS_COUNT_KEY,
+	ACCESS_LAST_KEY,
+	CONTENT_HASH_PRIVATE,
+	STATE_CLOUD,
+	_parse_content_hash,
+	get_backend,
+	get_config,
+)
+
+FLUSH_BATCH_SIZE = 500
+TIERING_BATCH_SIZE = 1000
+TIERING_MAX_SECONDS = 20 * 60
+DEFAULT_STORAGE_CLASS = "STANDARD"
+# classes that can still be read directly, so generate_file links keep working
+COLD_STORAGE_CLASSES = {
+	"Amazon S3": ("STANDARD_IA", "ONEZONE_IA", "INTELLIGENT_TIERING", "GLACIER_IR"),
+	"Google Cloud Storage": ("NEARLINE", "COLDLINE", "ARCHIVE"),
+}
+
+
+def _pop_access_log():
+	count_key = frappe.cache.make_key(ACCESS_COUNT_KEY)
+	last_key = frappe.cache.make_key(ACCESS_LAST_KEY)
+	pipe = frappe.cache.pipeline()
+	pipe.hgetall(count_key)
+	pipe.hgetall(last_key)
+	pipe.delete(count_key, last_key)
+	counts, last, _ = pipe.execute()
+	return (
+		{frappe.safe_decode(k): int(v) for k, v in counts.items()},
+		{frappe.safe_decode(k): frappe.safe_decode(v) for k, v in last.items()},
+	)
+
+
+def flush_access_log():
+	counts, last = _pop_access_log()
+	hashes = list(counts)
+	now = frappe.utils.now()
+	for i in range(0, len(hashes), FLUSH_BATCH_SIZE):
+		batch = hashes[i : i + FLUSH_BATCH_SIZE]
+		when = " ".join(["WHEN %s THEN %s"] * len(batch))
+		placeholders = ", ".join(["%s"] * len(batch))
+		values = []
+		for h in batch:
+			values += [h, counts[h]]
+		for h in batch:
+			values += [h, last.get(h) or now]
+		values += batch
+		frappe.db.sql(
+			f"""UPDATE `tabFile`
+			SET cloud_access_count = COALESCE(cloud_access_count, 0) + CASE content_hash {when} ELSE 0 END,
+				cloud_last_accessed = CASE content_hash {when} ELSE cloud_last_accessed END
+			WHERE content_hash IN ({placeholders})""",
+			values,
+		)
+		frappe.db.commit()
+
+
+def _mark_files(names, field, value):
+	for i in range(0, len(names), FLUSH_BATCH_SIZE):
+		batch = names[i : i + FLUSH_BATCH_SIZE]
+		frappe.db.sql(
+			f"""UPDATE `tabFile` SET `{field}`=%s
+			WHERE name IN ({", ".join(["%s"] * len(batch))})""",
+			[value, *batch],
+		)
+	frappe.db.commit()
+
+
+def _move_batch(backend, files, storage_class):
+	names_by_key = {}
+	for f in files:
+		key, _ = _parse_content_hash(f.content_hash)
+		if key:
+			names_by_key[key] = f.name
+	moved = []
+	failed = []
+	errors = []
+	for key, error, object_error in backend.set_storage_class(list(names_by_key), storage_class, "private"):
+		if not error:
+			moved.append(names_by_key[key])
+			continue
+		errors.append(f"{key}: {error}")
+		if object_error:
+			failed.append(names_by_key[key])
+	_mark_files(moved, "cloud_storage_class", storage_class)
+	# only errors about the object itself are sticky; clear the flag to retry
+	_mark_files(failed, "cloud_tiering_failed", 1)
+	if errors:
+		frappe.log_error(
+			title="MultiCloud Storage tiering: some files were not moved",
+			message="\n".join(errors[:100]),
+		)
+	return len(moved), len(failed), len(errors) - len(failed)
+
+
+def move_cold_files(after=None):
+	config = get_config()
+	if not config or not config.get("enable_storage_tiering"):
+		return
+	storage_class = (config.get("cold_storage_class") or "").strip()
+	if storage_class not in COLD_STORAGE_CLASSES.get(config.storage_provider, ()):
+		return
+	backend = get_backend(config)
+	if not backend or not hasattr(backend, "set_storage_class"):
+		return
+	cutoff = frappe.utils.add_days(frappe.utils.now_datetime(), -(config.get("cold_after_days") or 90))
+	deadline = time.monotonic() + TIERING_MAX_SECONDS
+	moved = failed = errors = 0
+	# public objects are served straight from the bucket or CDN, so they have no access data
+	while True:
+		files = frappe.db.sql(
+			"""SELECT name, content_hash FROM `tabFile`
+			WHERE cloud_storage_state=%s
+			AND content_hash LIKE %s
+			AND cloud_tiering_failed=0
+			AND COALESCE(cloud_storage_class, '') != %s
+			AND COALESCE(cloud_last_accessed, creation) < %s
+			AND name > %s
+			ORDER BY name
+			LIMIT %s""",
+			(STATE_CLOUD, CONTENT_HASH_PRIVATE + "%", storage_class, cutoff, after or "", TIERING_BATCH_SIZE),
+			as_dict=True,
+		)
+		if not files:
+			break
+		after = files[-1].name
+		batch_moved, batch_failed, batch_errors = _move_batch(backend, files, storage_class)
+		moved += batch_moved
+		failed += batch_failed
+		errors += batch_errors
+		if batch_errors and not batch_moved:
+			# nothing in the batch could be moved for reasons outside the objects; retry on the next run
+			break
+		if time.monotonic() > deadline:
+			frappe.enqueue(
+				"multi_cloud_storage.tiering.move_cold_files",
+				queue="long",
+				timeout=TIERING_MAX_SECONDS + 600,
+				after=after,
+			)
+			break
+	return {"moved": moved, "failed": failed, "errors": errors}
+
+
+@frappe.whitelist()
+def get_storage_tier_report():
+	frappe.only_for("System Manager")
+	return frappe.db.sql(
+		"""SELECT COALESCE(NULLIF(cloud_storage_class, ''), %s) AS storage_class,
+			COUNT(*) AS files, COALESCE(SUM(file_size), 0) AS bytes
+		FROM `tabFile`
+		WHERE cloud_storage_state=%s
+		GROUP BY 1
+		ORDER BY 3 DESC""",
+		(DEFAULT_STORAGE_CLASS, STATE_CLOUD),
+		as_dict=True,
+	)